@@ -0,0 +1,161 @@
+"""按语法树形状分组的批量求值
+
+生成器只产生少数几种括号模板。把表达式中的数字替换为占位符得到模板，
+相同模板的表达式把叶子的分子、分母排成NumPy int64数组后逐节点向量化计算，
+每个模板只解析一次。可能溢出的行回退到Python整数精确计算。
+未安装NumPy或批量较小（分组带来的开销超过收益）时逐个求值；NumPy在第一次需要时才导入，不拖慢启动。
+"""
+import re
+from functools import lru_cache
+
+from expression_parser import evaluate_expression, parse
+from rational import Rational
+
+np = None
+_numpy_loaded = False
+
+NUMBER_PATTERN = re.compile(r"(\d+)(?:/(\d+))?")
+
+# 参与乘法的两个数都小于2**31时，两个乘积之和不会超出int64
+SAFE_LIMIT = 2 ** 31
+
+# 少于这个数量的表达式直接逐个求值
+NUMPY_MIN_BATCH = 512
+
+
+def load_numpy():
+    """导入NumPy，未安装时返回None"""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_loaded = True
+    return np
+
+
+def tree_shape(tree):
+    """语法树的形状：保留运算符和结构，叶子替换为None"""
+    if tree.__class__ is not tuple:
+        return None
+    op, left, right = tree
+    return op, tree_shape(left), tree_shape(right)
+
+
+@lru_cache(maxsize=1024)
+def template_shape(template):
+    """解析模板（数字已替换为#）得到语法树形状，模板非法时抛出ValueError"""
+    return tree_shape(parse(template.replace('#', '1')))
+
+
+def leaf_count(shape):
+    if shape is None:
+        return 1
+    _, left, right = shape
+    return leaf_count(left) + leaf_count(right)
+
+
+def evaluate_batch(expressions):
+    """批量计算表达式，返回与输入一一对应的Rational列表，无法计算的位置为None"""
+    if len(expressions) < NUMPY_MIN_BATCH or load_numpy() is None:
+        return [_evaluate_exact(expression) for expression in expressions]
+
+    groups = {}
+    for index, expression in enumerate(expressions):
+        template = NUMBER_PATTERN.sub('#', expression).replace(' ', '')
+        groups.setdefault(template, []).append(index)
+
+    results = [None] * len(expressions)
+    for template, indices in groups.items():
+        try:
+            shape = template_shape(template)
+        except ValueError:
+            continue
+        if leaf_count(shape) != template.count('#'):
+            # 去掉空格后模板与原式不符（如 "3 / 4" 的模板 #/# 会被解析为一个分数），逐个求值
+            for index in indices:
+                results[index] = _evaluate_exact(expressions[index])
+            continue
+        _evaluate_group(shape, [expressions[index] for index in indices], indices, results)
+    return results
+
+
+def _evaluate_exact(expression):
+    try:
+        return evaluate_expression(expression)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _evaluate_group(shape, expressions, indices, results):
+    # 整组只做一次正则匹配，数字字符串交给NumPy批量转换为int64
+    numbers = NUMBER_PATTERN.findall(' '.join(expressions))
+    try:
+        numerators = np.array([n for n, _ in numbers]).astype(np.int64)
+        denominators = np.array([d or '1' for _, d in numbers]).astype(np.int64)
+    except OverflowError:
+        for expression, index in zip(expressions, indices):
+            results[index] = _evaluate_exact(expression)
+        return
+    numerators = numerators.reshape(len(expressions), -1)
+    denominators = denominators.reshape(len(expressions), -1)
+
+    state = {
+        'column': 0,
+        'numerators': numerators,
+        'denominators': denominators,
+        # 分母为0的分数字面量不合法
+        'invalid': (denominators == 0).any(axis=1),
+        'overflow': np.zeros(len(expressions), dtype=bool),
+    }
+    numerator, denominator = _evaluate_shape(shape, state)
+
+    invalid = state['invalid'].tolist()
+    overflow = state['overflow'].tolist()
+    for row, (index, n, d) in enumerate(zip(indices, numerator.tolist(), denominator.tolist())):
+        if overflow[row]:
+            results[index] = _evaluate_exact(expressions[row])
+        elif not invalid[row]:
+            results[index] = Rational(n, d)
+
+
+def _evaluate_shape(shape, state):
+    """对同一形状的所有行逐节点向量化计算，返回约分后的 (分子数组, 分母数组)"""
+    if shape is None:
+        column = state['column']
+        state['column'] += 1
+        numerator = state['numerators'][:, column]
+        denominator = state['denominators'][:, column]
+        return numerator, np.where(denominator == 0, 1, denominator)
+
+    op, left_shape, right_shape = shape
+    n1, d1 = _evaluate_shape(left_shape, state)
+    n2, d2 = _evaluate_shape(right_shape, state)
+
+    overflow = state['overflow']
+    for values in (n1, d1, n2, d2):
+        overflow |= np.abs(values) >= SAFE_LIMIT
+
+    if op == '+':
+        numerator = n1 * d2 + n2 * d1
+        denominator = d1 * d2
+    elif op == '-':
+        numerator = n1 * d2 - n2 * d1
+        denominator = d1 * d2
+    elif op == '×':
+        numerator = n1 * n2
+        denominator = d1 * d2
+    else:
+        zero = n2 == 0
+        state['invalid'] |= zero
+        numerator = n1 * d2
+        denominator = np.where(zero, 1, d1 * n2)
+        negative = denominator < 0
+        numerator = np.where(negative, -numerator, numerator)
+        denominator = np.where(negative, -denominator, denominator)
+
+    divisor = np.gcd(numerator, denominator)
+    divisor[divisor == 0] = 1
+    return numerator // divisor, denominator // divisor
@@ -0,0 +1,79 @@
+"""查重基准测试：比较线性交换律扫描与规范形式集合查重的生成耗时
+
+python benchmarks/bench_duplicates.py --sizes 10000 100000 1000000 -r 20
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import ArithmeticCalculator, ExpressionGenerator  # noqa: E402
+
+
+class LinearScanGenerator(ExpressionGenerator):
+    """原先的查重实现：逐个扫描已生成的表达式并按 + / × 拆分比较"""
+
+    def canonical_key(self, expression):
+        return expression.replace(' ', '')
+
+    def is_duplicate(self, expression):
+        normalized = self.canonical_key(expression)
+        if normalized in self.generated_expressions:
+            return True
+        for expr in self.generated_expressions:
+            if self.is_commutative_duplicate(normalized, expr):
+                return True
+        return False
+
+    def is_commutative_duplicate(self, expr1, expr2):
+        if '+' in expr1 and '+' in expr2:
+            parts1 = re.split(r'\+', expr1.replace('(', '').replace(')', ''))
+            parts2 = re.split(r'\+', expr2.replace('(', '').replace(')', ''))
+            if set(parts1) == set(parts2):
+                return True
+        if '×' in expr1 and '×' in expr2:
+            parts1 = re.split(r'×', expr1.replace('(', '').replace(')', ''))
+            parts2 = re.split(r'×', expr2.replace('(', '').replace(')', ''))
+            if set(parts1) == set(parts2):
+                return True
+        return False
+
+
+def run(generator_class, n, range_limit, seed):
+    """按 main() 的生成循环生成n道题目，返回耗时（秒）"""
+    generator = generator_class(range_limit, seed)
+    calculator = ArithmeticCalculator()
+    count = 0
+    start = time.perf_counter()
+    while count < n:
+        expression = generator.generate_expression()
+        if generator.is_duplicate(expression):
+            continue
+        answer = calculator.calculate(expression)
+        if answer is not None and generator.validate_expression(expression):
+            generator.generated_expressions.add(generator.canonical_key(expression))
+            count += 1
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查重基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('-r', type=int, default=20, help='数值范围')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--legacy-limit', type=int, default=20000,
+                        help='超过该数量时跳过线性扫描（其耗时随N平方增长）')
+    args = parser.parse_args()
+
+    print(f"{'N':>10} {'linear scan (s)':>16} {'canonical set (s)':>18}")
+    for n in args.sizes:
+        legacy = f"{run(LinearScanGenerator, n, args.r, args.seed):.2f}" if n <= args.legacy_limit else 'skipped'
+        current = run(ExpressionGenerator, n, args.r, args.seed)
+        print(f"{n:>10} {legacy:>16} {current:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
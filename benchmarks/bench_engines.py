@@ -0,0 +1,68 @@
+"""生成引擎基准测试：比较随机生成+校验与自底向上构造两种引擎的接受率和吞吐量
+
+python benchmarks/bench_engines.py -n 20000 --ranges 3 5 10 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import ConstructiveExpressionGenerator  # noqa: E402
+from main import ArithmeticCalculator, ExpressionGenerator  # noqa: E402
+
+ENGINES = {
+    'random': ExpressionGenerator,
+    'constructive': ConstructiveExpressionGenerator,
+}
+
+
+def run(generator_class, n, range_limit, seed):
+    """按 main.stream_exercises 的生成循环生成n道题目，统计候选数和校验次数"""
+    generator = generator_class(range_limit, seed)
+    calculator = ArithmeticCalculator()
+
+    validations = 0
+    rejection_reason = generator.rejection_reason
+
+    def counting_rejection_reason(expression):
+        nonlocal validations
+        validations += 1
+        return rejection_reason(expression)
+
+    # 随机引擎在 generate_checked 内部校验每个候选，构造引擎不需要校验
+    generator.rejection_reason = counting_rejection_reason
+
+    candidates = 0
+    count = 0
+    start = time.perf_counter()
+    while count < n:
+        expression, reason = generator.generate_checked()
+        candidates += 1
+        if generator.is_duplicate(expression) or reason is not None:
+            continue
+        calculator.calculate(expression)
+        generator.duplicates.add(expression)
+        count += 1
+    elapsed = time.perf_counter() - start
+    return candidates, validations, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成引擎基准测试')
+    parser.add_argument('-n', type=int, default=20000, help='每组生成题目数量')
+    parser.add_argument('--ranges', type=int, nargs='+', default=[3, 5, 10, 50])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'engine':>12} {'-r':>4} {'candidates':>10} {'accept %':>9} {'validations':>11} {'exercises/s':>12}")
+    for range_limit in args.ranges:
+        for name, generator_class in ENGINES.items():
+            candidates, validations, elapsed = run(generator_class, args.n, range_limit, args.seed)
+            print(f"{name:>12} {range_limit:>4} {candidates:>10} {100 * args.n / candidates:>9.1f} "
+                  f"{validations:>11} {args.n / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""有理数运算基准测试：比较Fraction与Rational两种数值表示下的求值和格式化耗时
+
+python benchmarks/bench_rational.py -n 1000000 -r 20
+"""
+import argparse
+import os
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expression_parser import evaluate, parse  # noqa: E402
+from main import ArithmeticCalculator, create_generator, generate_exercises  # noqa: E402
+
+
+def to_fraction_tree(tree):
+    """把Rational叶子替换为Fraction，得到旧的数值表示"""
+    if tree.__class__ is not tuple:
+        return Fraction(tree.numerator, tree.denominator)
+    op, left, right = tree
+    return op, to_fraction_tree(left), to_fraction_tree(right)
+
+
+def run(trees):
+    format_fraction = ArithmeticCalculator.format_fraction
+    start = time.perf_counter()
+    for tree in trees:
+        format_fraction(evaluate(tree))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='有理数运算基准测试')
+    parser.add_argument('-n', type=int, default=1000000, help='求值和格式化的表达式数量')
+    parser.add_argument('-r', type=int, default=20, help='数值范围')
+    parser.add_argument('--distinct', type=int, default=10000, help='不同表达式的数量')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generator = create_generator('random', args.r, args.seed)
+    exercises, _ = generate_exercises(generator, ArithmeticCalculator(), args.distinct)
+    rational_trees = [parse(exercise) for exercise in exercises]
+    rational_trees = (rational_trees * (args.n // len(rational_trees) + 1))[:args.n]
+    fraction_trees = [to_fraction_tree(tree) for tree in rational_trees]
+
+    fraction_time = run(fraction_trees)
+    rational_time = run(rational_trees)
+    print(f"{'engine':>10} {'seconds':>9} {'us/expr':>8}")
+    print(f"{'Fraction':>10} {fraction_time:>9.2f} {1e6 * fraction_time / args.n:>8.2f}")
+    print(f"{'Rational':>10} {rational_time:>9.2f} {1e6 * rational_time / args.n:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
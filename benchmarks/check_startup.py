@@ -0,0 +1,59 @@
+"""启动时间检查：用 python -X importtime 测量导入main.py的耗时，超出预算或导入了不该在启动时导入的模块时返回非零
+
+批处理脚本每天调用命令行工具上万次，启动时间直接计入每次批改的耗时。
+
+python benchmarks/check_startup.py --budget-ms 40 --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只在生成、多进程或大批量求值时才需要的模块
+LAZY_MODULES = ['argparse', 'random', 'fractions', 'json', 'numpy', 'concurrent.futures', 'tempfile', 'shutil',
+                'generator', 'operand_table', 'expression_space']
+
+
+def import_times(module):
+    """在新进程中导入module，返回 {模块名: 累计导入耗时(微秒)}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查命令行入口的导入耗时')
+    parser.add_argument('--module', default='main', help='要检查的入口模块')
+    parser.add_argument('--budget-ms', type=float, default=40, help='导入耗时预算（毫秒，取多次运行的最小值）')
+    parser.add_argument('--runs', type=int, default=5, help='运行次数')
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    best = min(times[args.module] for times in runs) / 1000
+    print(f"import {args.module}: {best:.1f} ms（{args.runs} 次中最快，预算 {args.budget_ms:.0f} ms）")
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)[1:11]
+    for name, cumulative in slowest:
+        print(f"  {name:<40} {cumulative / 1000:>8.1f} ms")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in runs[-1]]
+    if eager:
+        print(f"启动时不应导入: {', '.join(eager)}")
+        failed = True
+    if best > args.budget_ms:
+        print("超出启动时间预算")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
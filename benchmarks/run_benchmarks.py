@@ -0,0 +1,200 @@
+"""基准测试套件：覆盖生成、校验、求值、查重、比较答案、文件读写和批改各阶段
+
+每组参数（数值范围 -r、题目数量 -n、运算符数量组合）使用固定随机种子，结果可复现。
+每个阶段报告吞吐量、单个表达式耗时的p50/p99，以及单独运行一次时的内存峰值。
+
+python benchmarks/run_benchmarks.py --ranges 20 100 --sizes 1000 10000 --mixes 1 3 1-3 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_cache import shared_cache  # noqa: E402
+from main import (ArithmeticCalculator, FileManager, create_generator,  # noqa: E402
+                  generate_exercises, grade_files)
+
+
+def parse_mix(mix):
+    """运算符数量组合，如 "3" 或 "1-3" """
+    if '-' in mix:
+        low, high = mix.split('-')
+        return list(range(int(low), int(high) + 1))
+    return [int(mix)]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure(items, func):
+    """逐个调用func并记录每次耗时，返回统计结果"""
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for item in items:
+        begin = clock()
+        func(item)
+        latencies.append(clock() - begin)
+    total = clock() - start
+    latencies.sort()
+    return {
+        'count': len(latencies),
+        'seconds': total / 1e9,
+        'throughput': len(latencies) / (total / 1e9) if total else 0,
+        'p50_us': percentile(latencies, 0.50) / 1e3,
+        'p99_us': percentile(latencies, 0.99) / 1e3,
+    }
+
+
+def measure_once(count, func):
+    """整体运行一次func（如读写文件），按count折算单个表达式的平均耗时"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    per_item = seconds / count * 1e6 if count else 0
+    return {
+        'count': count,
+        'seconds': seconds,
+        'throughput': count / seconds if seconds else 0,
+        'p50_us': per_item,
+        'p99_us': per_item,
+    }
+
+
+def peak_memory(func):
+    """单独运行一次func，返回内存峰值（KB）"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def make_generator(range_limit, mix, seed):
+    generator = create_generator('random', range_limit, seed)
+    counts = parse_mix(mix)
+    generator.generate_operator_count = lambda: generator.random.choice(counts)
+    return generator
+
+
+def run_case(range_limit, n, mix, seed, workdir):
+    """对一组参数依次测量各阶段，返回 {阶段名: 统计结果}"""
+    calculator = ArithmeticCalculator()
+    results = {}
+
+    def stage(name, run, memory_run):
+        shared_cache.clear()
+        results[name] = run()
+        shared_cache.clear()
+        results[name]['peak_kb'] = peak_memory(memory_run)
+
+    # 生成模式各阶段
+    generator = make_generator(range_limit, mix, seed)
+    expressions = [generator.generate_expression() for _ in range(n)]
+
+    def generate_candidates(timed):
+        candidate_generator = make_generator(range_limit, mix, seed)
+        if timed:
+            return measure(range(n), lambda _: candidate_generator.generate_expression())
+        return [candidate_generator.generate_expression() for _ in range(n)]
+
+    stage('generate_expression', lambda: generate_candidates(True), lambda: generate_candidates(False))
+    stage('validate_expression',
+          lambda: measure(expressions, generator.validate_expression),
+          lambda: [generator.validate_expression(expression) for expression in expressions])
+    stage('calculate',
+          lambda: measure(expressions, calculator.calculate),
+          lambda: [calculator.calculate(expression) for expression in expressions])
+
+    def check_duplicates(expression):
+        if not generator.is_duplicate(expression):
+            generator.generated_expressions.add(generator.canonical_key(expression))
+
+    def duplicates(timed):
+        generator.generated_expressions.clear()
+        if timed:
+            return measure(expressions, check_duplicates)
+        for expression in expressions:
+            check_duplicates(expression)
+
+    stage('is_duplicate', lambda: duplicates(True), lambda: duplicates(False))
+
+    exercises, answers = generate_exercises(make_generator(range_limit, mix, seed), calculator, n)
+    pairs = list(zip(answers, answers))
+    stage('compare_answers',
+          lambda: measure(pairs, lambda pair: calculator.compare_answers(*pair)),
+          lambda: [calculator.compare_answers(*pair) for pair in pairs])
+
+    exercise_file = os.path.join(workdir, 'Exercises.txt')
+    answer_file = os.path.join(workdir, 'Answers.txt')
+    grade_file = os.path.join(workdir, 'Grade.txt')
+
+    def save():
+        FileManager.save_exercises(exercises, exercise_file)
+        FileManager.save_answers(answers, answer_file)
+
+    def load():
+        FileManager.load_exercises(exercise_file)
+        FileManager.load_answers(answer_file)
+
+    def generate_mode():
+        found = generate_exercises(make_generator(range_limit, mix, seed), calculator, n)
+        FileManager.save_exercises(found[0], exercise_file)
+        FileManager.save_answers(found[1], answer_file)
+
+    stage('save_files', lambda: measure_once(n, save), save)
+    stage('load_files', lambda: measure_once(n, load), load)
+
+    # 两种模式端到端
+    stage('generation_mode', lambda: measure_once(n, generate_mode), generate_mode)
+    stage('grading_mode',
+          lambda: measure_once(n, lambda: grade_files(exercise_file, answer_file, grade_file)),
+          lambda: grade_files(exercise_file, answer_file, grade_file))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='四则运算题目生成器基准测试')
+    parser.add_argument('--ranges', type=int, nargs='+', default=[20, 100], help='数值范围 -r')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='题目数量 -n')
+    parser.add_argument('--mixes', nargs='+', default=['1', '3', '1-3'], help='运算符数量组合，如 1 或 1-3')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='以JSON格式保存结果的文件')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': [],
+    }
+
+    print(f"{'-r':>5} {'-n':>7} {'mix':>5} {'stage':>20} {'items/s':>10} {'p50 us':>9} {'p99 us':>9} {'peak KB':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for range_limit in args.ranges:
+            for n in args.sizes:
+                for mix in args.mixes:
+                    stages = run_case(range_limit, n, mix, args.seed, workdir)
+                    report['cases'].append({'range': range_limit, 'n': n, 'mix': mix, 'stages': stages})
+                    for name, result in stages.items():
+                        print(f"{range_limit:>5} {n:>7} {mix:>5} {name:>20} {result['throughput']:>10.0f} "
+                              f"{result['p50_us']:>9.1f} {result['p99_us']:>9.1f} {result['peak_kb']:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
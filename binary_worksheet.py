@@ -0,0 +1,223 @@
+"""二进制题目文件
+
+文件结构（小端）：
+    头部    8字节魔数 + uint64 题目数量
+    索引    每题一个uint64，指向该题记录在文件中的偏移
+    记录    int64 答案分子 + int64 答案分母 + uint16 语法树字节数 + 语法树
+
+语法树按前序编码：运算符节点一个字节（1-4 对应 + - × ÷），
+分子分母都小于256的叶子为字节0后跟uint8分子、uint8分母，其余叶子为字节5后跟uint32分子、uint32分母。
+读取时通过mmap直接访问，批改时使用预先计算好的答案，无需重新求值。
+
+转换为文本格式或从文本格式转换：
+    python binary_worksheet.py to-bin Exercises.txt Exercises.bin
+    python binary_worksheet.py to-text Exercises.bin Exercises.txt Answers.txt
+
+批量生成的多份题目写成一个归档：头部换用归档魔数，并在题目数量之后记录uint64每份题目数和uint64份数，
+其余结构相同；每份N题依次存放，第k份（从1开始）是第(k-1)*N到k*N-1题。
+    python binary_worksheet.py to-text Worksheets.bin Exercises.txt Answers.txt --sheet 3
+"""
+import mmap
+import struct
+
+from core import format_value, load_exercises, save_answers, save_exercises
+from expression_parser import parse, render
+from rational import Rational
+
+MAGIC = b'CALCWS1\0'
+HEADER = struct.Struct('<8sQ')
+ARCHIVE_MAGIC = b'CALCWA1\0'
+ARCHIVE_HEADER = struct.Struct('<8sQQQ')
+OFFSET = struct.Struct('<Q')
+RECORD = struct.Struct('<qqH')
+SMALL_LEAF = struct.Struct('<BB')
+LEAF = struct.Struct('<II')
+SMALL_LEAF_CODE = 0
+LEAF_CODE = 5
+
+OPERATOR_CODES = {'+': 1, '-': 2, '×': 3, '÷': 4}
+CODE_OPERATORS = {code: op for op, code in OPERATOR_CODES.items()}
+
+
+def encode_tree(tree, out):
+    """前序编码语法树，追加到bytearray"""
+    if tree.__class__ is not tuple:
+        if tree.numerator < 256 and tree.denominator < 256:
+            out.append(SMALL_LEAF_CODE)
+            out += SMALL_LEAF.pack(tree.numerator, tree.denominator)
+        else:
+            out.append(LEAF_CODE)
+            out += LEAF.pack(tree.numerator, tree.denominator)
+        return out
+    op, left, right = tree
+    out.append(OPERATOR_CODES[op])
+    encode_tree(left, out)
+    encode_tree(right, out)
+    return out
+
+
+def decode_tree(buffer, pos):
+    """从buffer的pos处解码一棵语法树，返回 (语法树, 结束位置)"""
+    code = buffer[pos]
+    if code == SMALL_LEAF_CODE:
+        numerator, denominator = SMALL_LEAF.unpack_from(buffer, pos + 1)
+        return Rational(numerator, denominator), pos + 1 + SMALL_LEAF.size
+    if code == LEAF_CODE:
+        numerator, denominator = LEAF.unpack_from(buffer, pos + 1)
+        return Rational(numerator, denominator), pos + 1 + LEAF.size
+    left, pos = decode_tree(buffer, pos + 1)
+    right, pos = decode_tree(buffer, pos)
+    return (CODE_OPERATORS[code], left, right), pos
+
+
+def save_binary(filename, exercises, values, sheet_size=None):
+    """写入二进制题目文件，values为每道题的精确答案（Rational/Fraction/int）
+
+    sheet_size不为None时写成每份sheet_size道题目的多份题目归档，题目总数必须是它的整数倍。
+    """
+    records = []
+    for exercise, value in zip(exercises, values):
+        tree = encode_tree(parse(exercise), bytearray())
+        value = value.reduced() if isinstance(value, Rational) else value
+        try:
+            records.append(RECORD.pack(value.numerator, value.denominator, len(tree)) + tree)
+        except struct.error:
+            raise ValueError(f"题目超出二进制格式的数值范围: {exercise}")
+
+    if sheet_size is None:
+        header = HEADER.pack(MAGIC, len(records))
+    else:
+        if sheet_size < 1 or len(records) % sheet_size:
+            raise ValueError(f"{len(records)}道题目不能分成每份{sheet_size}道")
+        header = ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(records), sheet_size, len(records) // sheet_size)
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        offset = len(header) + OFFSET.size * len(records)
+        index = bytearray()
+        for record in records:
+            index += OFFSET.pack(offset)
+            offset += len(record)
+        f.write(index)
+        f.write(b''.join(records))
+
+
+def is_binary_worksheet(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) in (MAGIC, ARCHIVE_MAGIC)
+
+
+class BinaryWorksheet:
+    """以mmap方式读取二进制题目文件或多份题目归档，按下标直接访问题目和答案
+
+    普通题目文件视为只有一份的归档。
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._map, 0)
+        if magic == MAGIC:
+            header_size = HEADER.size
+            self.sheet_size, self.sheet_count = count, 1
+        elif magic == ARCHIVE_MAGIC:
+            header_size = ARCHIVE_HEADER.size
+            _, _, self.sheet_size, self.sheet_count = ARCHIVE_HEADER.unpack_from(self._map, 0)
+            if self.sheet_size * self.sheet_count != count:
+                self.close()
+                raise ValueError(f"归档头部不一致：{self.sheet_count}份×{self.sheet_size}题≠{count}题")
+        else:
+            self.close()
+            raise ValueError(f"不是二进制题目文件: {filename}")
+        self._count = count
+        # 直接把mmap中的索引区视为uint64数组，不复制
+        self._offsets = memoryview(self._map)[header_size:header_size + OFFSET.size * count].cast('Q')
+
+    def __len__(self):
+        return self._count
+
+    def sheet_range(self, sheet):
+        """第sheet份（从1开始）题目的下标范围"""
+        if not 1 <= sheet <= self.sheet_count:
+            raise ValueError(f"第{sheet}份不存在，共{self.sheet_count}份")
+        return range((sheet - 1) * self.sheet_size, sheet * self.sheet_size)
+
+    def answer(self, k):
+        """第k题（从0开始）的精确答案"""
+        numerator, denominator, _ = RECORD.unpack_from(self._map, self._offsets[k])
+        return Rational(numerator, denominator)
+
+    def tree(self, k):
+        offset = self._offsets[k] + RECORD.size
+        return decode_tree(self._map, offset)[0]
+
+    def expression(self, k):
+        return render(self.tree(k))
+
+    def __iter__(self):
+        """依次产生 (题目, 答案)"""
+        for k in range(self._count):
+            yield self.expression(k), self.answer(k)
+
+    def close(self):
+        offsets = getattr(self, '_offsets', None)
+        if offsets is not None:
+            offsets.release()
+            self._offsets = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def text_to_binary(exercise_file, binary_file):
+    """把文本题目文件转换为二进制格式，答案重新精确计算"""
+    from evaluation_cache import shared_cache
+
+    exercises = load_exercises(exercise_file)
+    save_binary(binary_file, exercises, [shared_cache.evaluate(exercise) for exercise in exercises])
+
+
+def binary_to_text(binary_file, exercise_file, answer_file, sheet=None):
+    """把二进制题目文件（sheet不为None时为归档中的第sheet份）还原为文本题目和答案文件"""
+    with BinaryWorksheet(binary_file) as worksheet:
+        indices = range(len(worksheet)) if sheet is None else worksheet.sheet_range(sheet)
+        exercises = []
+        answers = []
+        for k in indices:
+            exercises.append(worksheet.expression(k))
+            answers.append(format_value(worksheet.answer(k)))
+    save_exercises(exercises, exercise_file)
+    save_answers(answers, answer_file)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='二进制题目文件与文本格式互相转换')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    to_bin = subparsers.add_parser('to-bin', help='文本题目文件转换为二进制')
+    to_bin.add_argument('exercises')
+    to_bin.add_argument('binary')
+    to_text = subparsers.add_parser('to-text', help='二进制转换为文本题目和答案文件')
+    to_text.add_argument('binary')
+    to_text.add_argument('exercises')
+    to_text.add_argument('answers')
+    to_text.add_argument('--sheet', type=int, help='只导出多份题目归档中的第几份（从1开始）')
+    args = parser.parse_args()
+
+    if args.command == 'to-bin':
+        text_to_binary(args.exercises, args.binary)
+    else:
+        try:
+            binary_to_text(args.binary, args.exercises, args.answers, args.sheet)
+        except ValueError as e:
+            parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""全班批改：同一份题目文件批改多名学生的答案文件
+
+题目只求值一次，得到每题精确答案（Rational，即分子分母整数对）组成的答案表，
+之后每份答案文件只需逐行解析并与答案表交叉相乘比较，不再重复求值，也不用为每名学生启动一次进程。
+多进程时答案表通过进程池的初始化函数只向每个进程传送一次。
+
+每名学生生成一个与 Grade.txt 格式相同的批改文件 Grade_<答案文件名>.txt，
+另外生成汇总文件 Summary.txt：每名学生的正确、错误、无法解析数量，以及每题答错的人数。
+答案文件分布在多个目录时，文件名取相对于它们共同上级目录的路径，分隔符换成下划线
+（class/alice/Answers.txt 对应 Grade_alice_Answers.txt）。
+
+python main.py -e Exercises.txt --submissions answers/ --grade-dir Grades --workers 4
+python main.py -e Exercises.txt --submissions "answers/*.txt"
+python main.py -e Exercises.txt --submissions "class/*/Answers.txt"
+"""
+import glob
+import os
+from array import array
+from collections import Counter
+from itertools import islice
+
+from batch_eval import evaluate_batch
+from binary_worksheet import BinaryWorksheet, is_binary_worksheet
+from core import GradeWriter, grade_answer
+from file_io import iter_numbered_answers, iter_numbered_exercises, pair_by_number
+
+# 建立答案表时每次批量求值的题目数
+KEY_CHUNK_SIZE = 65536
+
+# 子进程中的答案表，由 _init_worker 设置
+_worker_key = None
+
+
+def build_answer_key(exercise_file):
+    """求出题目文件中每题的精确答案，返回 (题号, 答案) 列表，无法计算的题目答案为None
+
+    二进制题目文件直接读取预先计算好的答案。
+    """
+    if is_binary_worksheet(exercise_file):
+        with BinaryWorksheet(exercise_file) as worksheet:
+            return [(k + 1, worksheet.answer(k)) for k in range(len(worksheet))]
+
+    key = []
+    exercises = iter_numbered_exercises(exercise_file)
+    while True:
+        chunk = list(islice(exercises, KEY_CHUNK_SIZE))
+        if not chunk:
+            return key
+        key.extend(zip([number for number, _ in chunk], evaluate_batch([exercise for _, exercise in chunk])))
+
+
+def find_submissions(submissions):
+    """目录时取其中全部 .txt 文件，否则按通配符展开；按文件名排序"""
+    if os.path.isdir(submissions):
+        pattern = os.path.join(submissions, '*.txt')
+    else:
+        pattern = submissions
+    return sorted(glob.glob(pattern))
+
+
+def submission_names(answer_files):
+    """每份答案文件相对于全部答案文件共同上级目录的路径；都在同一目录时就是文件名"""
+    if not answer_files:
+        return []
+    paths = [os.path.abspath(answer_file) for answer_file in answer_files]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.relpath(path, root) for path in paths]
+
+
+def grade_file_for(name, grade_dir):
+    """name为 submission_names 给出的相对路径，其中的目录分隔符换成下划线"""
+    stem = os.path.splitext(name)[0].replace(os.sep, '_')
+    if os.altsep:
+        stem = stem.replace(os.altsep, '_')
+    return os.path.join(grade_dir, f"Grade_{stem}.txt")
+
+
+def grade_submission(answer_file, grade_file, key=None):
+    """用答案表按题号批改一份答案文件，返回 (正确数, 错误数, 无法解析数, 答错的题号数组)
+
+    缺少的答案计为无法解析。
+    """
+    if key is None:
+        key = _worker_key
+    wrong = array('Q')
+    with GradeWriter(grade_file) as writer:
+        for number, value, answer in pair_by_number(key, iter_numbered_answers(answer_file)):
+            is_correct, invalid = grade_answer(answer, value)
+            writer.add(number, is_correct, invalid)
+            if not is_correct:
+                wrong.append(number)
+    return writer.correct_count, writer.wrong_count, writer.invalid_count, wrong
+
+
+def _init_worker(key):
+    global _worker_key
+    _worker_key = key
+
+
+def grade_class(exercise_file, answer_files, grade_dir='Grades', workers=1, stats=None):
+    """批改全部答案文件，写出每名学生的批改文件和汇总文件，返回 {答案文件: (正确数, 错误数, 无法解析数)}
+
+    两份答案文件对应同一个批改文件名时抛出ValueError，不批改任何文件。
+    """
+    from profiling import timer
+
+    names = submission_names(answer_files)
+    grade_files = [grade_file_for(name, grade_dir) for name in names]
+    collisions = [grade_file for grade_file, count in Counter(grade_files).items() if count > 1]
+    if collisions:
+        raise ValueError(f"多份答案文件对应同一个批改文件: {', '.join(collisions)}")
+
+    with timer(stats, 'answer_key'):
+        key = build_answer_key(exercise_file)
+    os.makedirs(grade_dir, exist_ok=True)
+
+    with timer(stats, 'grading'):
+        if workers > 1 and len(answer_files) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key,)) as executor:
+                results = list(executor.map(grade_submission, answer_files, grade_files))
+        else:
+            results = [grade_submission(answer_file, grade_file, key)
+                       for answer_file, grade_file in zip(answer_files, grade_files)]
+
+    summary = {answer_file: result[:3] for answer_file, result in zip(answer_files, results)}
+    write_summary(os.path.join(grade_dir, 'Summary.txt'), dict(zip(names, summary.values())),
+                  [result[3] for result in results], len(key))
+    if stats is not None:
+        stats.count('submissions', len(answer_files))
+        stats.count('exercises', len(key))
+        for correct, wrong, invalid in summary.values():
+            stats.count('correct', correct)
+            stats.count('wrong', wrong)
+            stats.count('invalid', invalid)
+    return summary
+
+
+def write_summary(filename, summary, wrong_indices, exercise_count):
+    """汇总每名学生的结果和每题答错的人数（按人数从多到少，只列出有人答错的题目）
+
+    summary的键为 submission_names 给出的答案文件名。
+    """
+    misses = Counter()
+    for indices in wrong_indices:
+        misses.update(indices)
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"Students: {len(summary)}\n")
+        f.write(f"Exercises: {exercise_count}\n")
+        for name, (correct, wrong, invalid) in summary.items():
+            f.write(f"{name}: Correct: {correct}, Wrong: {wrong}, Invalid: {invalid}\n")
+        missed = sorted(misses, key=lambda index: (-misses[index], index))
+        f.write(f"Missed: {len(missed)} ({', '.join(f'{index}: {misses[index]}' for index in missed)})\n")
@@ -0,0 +1,120 @@
+"""共享核心库
+
+命令行、批改服务、二进制格式转换和基准测试都通过这里使用同一套实现：
+    词法分析与求值  tokenize、parse、evaluate、evaluate_expression（expression_parser）
+    格式化          format_value
+    答案解析与比较  parse_answer_pair、parse_answer、answer_matches、grade_answer、answers_equal
+    查重            DuplicateChecker
+    文件读写        save_exercises、iter_exercises、GradeWriter 等（file_io）
+
+旧的类名 main.ArithmeticCalculator、main.FileManager、main.ExpressionGenerator、
+calculator.ExpressionCalculator 和 validator.DuplicateChecker 保留为调用这里的兼容层。
+"""
+import re
+
+from expression_parser import canonical_key, evaluate, evaluate_expression, parse, render, tokenize
+from file_io import (GradeWriter, NumberedWriter, WorksheetReader, iter_answers, iter_exercises, load_answers,
+                     load_exercises, open_answers, open_exercises, parse_answer_line, parse_exercise_line,
+                     save_answers, save_exercises, save_grade, write_numbered)
+from rational import Rational
+
+# 答案：整数 n、分数 a/b（可以未约分）或带分数 w'a/b，各部分之间可以有空白，可以带负号
+ANSWER_PATTERN = re.compile(r"\s*(-?)\s*(\d+)\s*(?:'\s*(\d+)\s*/\s*(\d+)|/\s*(\d+))?\s*")
+
+
+def format_value(value):
+    """把精确值格式化为答案：整数、真分数 a/b 或带分数 w'a/b"""
+    if isinstance(value, Rational):
+        value = value.reduced()
+    # int、Rational、Fraction都有numerator和denominator属性
+    if hasattr(value, 'denominator'):
+        numerator, denominator = value.numerator, value.denominator
+        if denominator == 1:
+            return str(numerator)
+        if numerator >= denominator:
+            whole, remainder = divmod(numerator, denominator)
+            return f"{whole}'{remainder}/{denominator}"
+        return f"{numerator}/{denominator}"
+
+    from fractions import Fraction
+
+    try:
+        return format_value(Fraction(value).limit_denominator())
+    except (TypeError, ValueError, OverflowError):
+        return str(value)
+
+
+def parse_answer_pair(text):
+    """一次正则匹配把答案解析为 (分子, 分母) 整数对，不约分；格式不正确或分母为零时返回None"""
+    if text.__class__ is not str:
+        return None
+    m = ANSWER_PATTERN.fullmatch(text)
+    if m is None:
+        return None
+    sign, whole, numerator, denominator, plain_denominator = m.groups()
+    if plain_denominator is not None:
+        numerator, denominator = int(whole), int(plain_denominator)
+    elif denominator is not None:
+        denominator = int(denominator)
+        numerator = int(whole) * denominator + int(numerator)
+    else:
+        numerator, denominator = int(whole), 1
+    if denominator == 0:
+        return None
+    return (-numerator if sign else numerator), denominator
+
+
+def parse_answer(text):
+    """把答案解析为Rational，格式不正确或分母为零时抛出ValueError"""
+    pair = parse_answer_pair(text)
+    if pair is None:
+        raise ValueError(f"无法解析的答案: {text!r}")
+    return Rational(*pair)
+
+
+def answer_matches(pair, value):
+    """答案整数对与精确值（Rational/Fraction/int）是否相等：交叉相乘比较，不计算gcd"""
+    return pair[0] * value.denominator == value.numerator * pair[1]
+
+
+def grade_answer(answer, value):
+    """批改一道题，返回 (是否正确, 答案是否无法解析)；value为None表示题目本身无法计算"""
+    pair = parse_answer_pair(answer)
+    if pair is None:
+        return False, True
+    return value is not None and answer_matches(pair, value), False
+
+
+def answers_equal(answer1, answer2):
+    """两个答案的值是否相等；任一答案无法解析时视为不相等"""
+    pair1 = parse_answer_pair(answer1)
+    pair2 = parse_answer_pair(answer2)
+    if pair1 is None or pair2 is None:
+        return False
+    return pair1[0] * pair2[1] == pair2[0] * pair1[1]
+
+
+class DuplicateChecker:
+    """按规范形式查重：交换律等价的表达式视为重复，检查和记录都是O(1)的"""
+
+    __slots__ = ('keys',)
+
+    def __init__(self, keys=None):
+        self.keys = set() if keys is None else keys
+
+    def __contains__(self, expression):
+        return canonical_key(expression) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, expression):
+        self.keys.add(canonical_key(expression))
+
+    def check_and_add(self, expression):
+        """表达式重复时返回True，否则记录它并返回False"""
+        key = canonical_key(expression)
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+from batch_eval import evaluate_batch
+from expression_parser import ConstraintError, canonical_key, evaluate, evaluate_checked, parse
+
+DEFAULT_CACHE_SIZE = 65536
+
+
+class EvaluationCache:
+    """按规范形式缓存表达式求值结果的LRU缓存
+
+    交换律等价的表达式（如 1 + 2 与 2 + 1）共享同一条缓存。
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def evaluate(self, expression):
+        """返回表达式的Rational值，除数为零时抛出ZeroDivisionError"""
+        key = canonical_key(expression)
+        values = self._values
+        if key in values:
+            self.hits += 1
+            values.move_to_end(key)
+            return values[key]
+
+        self.misses += 1
+        value = evaluate(parse(expression))
+        self._store(key, value)
+        return value
+
+    def evaluate_many(self, expressions):
+        """批量求值，返回与输入一一对应的Rational列表，无法计算的位置为None
+
+        命中缓存的直接取值，其余交给 batch_eval.evaluate_batch 一起计算后放入缓存。
+        """
+        values = self._values
+        results = [None] * len(expressions)
+        missing = []
+        keys = []
+        for index, expression in enumerate(expressions):
+            try:
+                key = canonical_key(expression)
+            except (ValueError, ZeroDivisionError):
+                continue
+            if key in values:
+                self.hits += 1
+                values.move_to_end(key)
+                results[index] = values[key]
+            else:
+                missing.append(index)
+                keys.append(key)
+
+        self.misses += len(missing)
+        for index, key, value in zip(missing, keys, evaluate_batch([expressions[index] for index in missing])):
+            if value is not None:
+                self._store(key, value)
+            results[index] = value
+        return results
+
+    def evaluate_checked(self, expression, max_denominator=None, max_value=None):
+        """逐节点检查约束并求值（见 expression_parser.evaluate_checked）
+
+        校验结果（值或违反的约束）按 (规范形式, 上限) 缓存；合法时值同时按规范形式缓存，随后计算答案时直接命中。
+        违反约束时抛出ConstraintError，表达式不合法时抛出ValueError。
+        """
+        key = canonical_key(expression)
+        checked_key = (key, max_denominator, max_value)
+        values = self._values
+        if checked_key in values:
+            self.hits += 1
+            values.move_to_end(checked_key)
+            result = values[checked_key]
+            if result.__class__ is str:
+                raise ConstraintError(result)
+            return result
+
+        self.misses += 1
+        try:
+            value = evaluate_checked(parse(expression), max_denominator, max_value)
+        except ConstraintError as error:
+            self._store(checked_key, error.reason)
+            raise
+        self._store(checked_key, value)
+        self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        values = self._values
+        values[key] = value
+        values.move_to_end(key)
+        if len(values) > self.max_size:
+            values.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._values.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {
+            'size': len(self._values),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._values)
+
+
+# 生成器和批改器共用的缓存
+shared_cache = EvaluationCache()
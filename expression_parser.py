@@ -0,0 +1,203 @@
+import operator
+import re
+from functools import lru_cache
+
+from rational import Rational
+
+# 词法单元：真分数 a/b、整数、运算符和括号
+TOKEN_PATTERN = re.compile(r"\s*(?:(\d+)/(\d+)|(\d+)|([-+×÷()]))")
+
+# 两个数字之间只隔着空白（如 "1 2"），移除空格后会被拼成一个数
+DIGIT_GAP_PATTERN = re.compile(r"\d\s+\d")
+
+ADDITIVE_OPERATORS = frozenset('+-')
+MULTIPLICATIVE_OPERATORS = frozenset('×÷')
+COMMUTATIVE_OPERATORS = frozenset('+×')
+
+PRECEDENCE = {'+': 1, '-': 1, '×': 2, '÷': 2}
+
+OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '×': operator.mul,
+    '÷': operator.truediv,
+}
+
+PARSE_CACHE_SIZE = 65536
+
+
+def tokenize(expression):
+    """把表达式拆分为词法单元，数字直接转换为约分后的Rational"""
+    tokens = []
+    pos = 0
+    length = len(expression)
+    match = TOKEN_PATTERN.match
+    while pos < length:
+        m = match(expression, pos)
+        if m is None:
+            if expression[pos:].strip():
+                raise ValueError(f"无法识别的字符: {expression[pos:]!r}")
+            break
+        numerator, denominator, integer, symbol = m.groups()
+        if symbol is not None:
+            tokens.append(symbol)
+        elif integer is not None:
+            tokens.append(Rational(int(integer)))
+        else:
+            tokens.append(Rational(int(numerator), int(denominator)).reduced())
+        pos = m.end()
+    return tokens
+
+
+def normalize_expression(expression):
+    """标准化表达式（移除空格），作为语法树缓存的键；数字之间只隔着空白时抛出ValueError"""
+    if DIGIT_GAP_PATTERN.search(expression):
+        raise ValueError(f"数字之间缺少运算符: {expression}")
+    return expression.replace(' ', '')
+
+
+def parse(expression):
+    """把表达式解析为语法树
+
+    叶子节点是Rational，内部节点是 (运算符, 左子树, 右子树) 元组。
+    解析结果按标准化后的字符串缓存。
+    """
+    return _parse_normalized(normalize_expression(expression))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized(expression):
+    tokens = tokenize(expression)
+    if not tokens:
+        raise ValueError("表达式为空")
+    tree, pos = _parse_sum(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError(f"表达式存在多余内容: {expression}")
+    return tree
+
+
+def _parse_sum(tokens, pos):
+    node, pos = _parse_product(tokens, pos)
+    while pos < len(tokens) and tokens[pos] in ADDITIVE_OPERATORS:
+        op = tokens[pos]
+        right, pos = _parse_product(tokens, pos + 1)
+        node = (op, node, right)
+    return node, pos
+
+
+def _parse_product(tokens, pos):
+    node, pos = _parse_atom(tokens, pos)
+    while pos < len(tokens) and tokens[pos] in MULTIPLICATIVE_OPERATORS:
+        op = tokens[pos]
+        right, pos = _parse_atom(tokens, pos + 1)
+        node = (op, node, right)
+    return node, pos
+
+
+def _parse_atom(tokens, pos):
+    if pos >= len(tokens):
+        raise ValueError("表达式意外结束")
+    token = tokens[pos]
+    if token == '(':
+        node, pos = _parse_sum(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos] != ')':
+            raise ValueError("括号不匹配")
+        return node, pos + 1
+    if isinstance(token, Rational):
+        return token, pos + 1
+    raise ValueError(f"意外的符号: {token}")
+
+
+def evaluate(tree):
+    """在Rational上直接计算语法树的值"""
+    if tree.__class__ is not tuple:
+        return tree
+    op, left, right = tree
+    return OPERATIONS[op](evaluate(left), evaluate(right))
+
+
+class ConstraintError(ValueError):
+    """逐节点检查时某个节点违反约束，reason为原因"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def evaluate_checked(tree, max_denominator=None, max_value=None):
+    """逐节点计算语法树并检查约束，返回约分后的Rational
+
+    任一节点违反约束时立即抛出ConstraintError，不再计算其余子树：
+        negative           减法结果为负
+        division_by_zero   除数为零
+        improper_division  除法结果不小于1且不是整数
+        too_large          中间结果约分后分母超过max_denominator，或绝对值超过max_value
+    每个节点的结果都约分后再参与运算，设置上限后单个表达式的计算量有界。
+    """
+    if tree.__class__ is not tuple:
+        return tree
+    op, left, right = tree
+    left_value = evaluate_checked(left, max_denominator, max_value)
+    right_value = evaluate_checked(right, max_denominator, max_value)
+    if op == '-':
+        if left_value < right_value:
+            raise ConstraintError('negative')
+    elif op == '÷':
+        if not right_value:
+            raise ConstraintError('division_by_zero')
+    value = OPERATIONS[op](left_value, right_value).reduced()
+    if op == '÷' and value.denominator != 1 and value.numerator >= value.denominator:
+        raise ConstraintError('improper_division')
+    if max_denominator is not None and value.denominator > max_denominator:
+        raise ConstraintError('too_large')
+    if max_value is not None and abs(value.numerator) > max_value * value.denominator:
+        raise ConstraintError('too_large')
+    return value
+
+
+def evaluate_expression(expression):
+    """解析并计算表达式，除数为零时抛出ZeroDivisionError"""
+    return evaluate(parse(expression))
+
+
+def render(tree):
+    """把语法树还原为表达式字符串，只在必要处加括号
+
+    同优先级的右子树也加括号，保证重新解析得到同一棵语法树。
+    """
+    if tree.__class__ is not tuple:
+        return str(tree)
+    op, left, right = tree
+    left_text = render(left)
+    right_text = render(right)
+    if left.__class__ is tuple and PRECEDENCE[left[0]] < PRECEDENCE[op]:
+        left_text = f"({left_text})"
+    if right.__class__ is tuple and PRECEDENCE[right[0]] <= PRECEDENCE[op]:
+        right_text = f"({right_text})"
+    return f"{left_text} {op} {right_text}"
+
+
+def canonical_form(tree):
+    """生成语法树的规范形式字符串
+
+    对 + 和 × 节点的两个操作数递归排序，
+    因此只经过有限次交换律变换就能互相得到的表达式具有相同的规范形式。
+    """
+    if tree.__class__ is not tuple:
+        return str(tree)
+    op, left, right = tree
+    left = canonical_form(left)
+    right = canonical_form(right)
+    if op in COMMUTATIVE_OPERATORS and right < left:
+        left, right = right, left
+    return f"({left}{op}{right})"
+
+
+def canonical_key(expression):
+    """解析表达式并返回其规范形式，用于O(1)查重；结果按标准化后的字符串缓存"""
+    return _canonical_key_normalized(normalize_expression(expression))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _canonical_key_normalized(expression):
+    return canonical_form(_parse_normalized(expression))
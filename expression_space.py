@@ -0,0 +1,200 @@
+"""小数值范围下全部合法题目的枚举索引
+
+按运算符数量k自底向上枚举：含k个运算符的表达式由左右两棵运算符数之和为k-1的子树组合而成。
+合法性规则与 ConstructiveExpressionGenerator 相同（减法非负、除数非零、除法结果为真分数或整数），
+并按规范形式去重，因此索引中的每一项都是互不重复的题目。
+枚举结果按 (数值范围, 运算符数量) 缓存到磁盘，每行一道题目，另有一个索引文件记录每行的起始偏移（uint64数组）。
+读取时用mmap映射缓存文件，只解码抽到的那几行，不把全部题目载入内存。
+
+枚举需要检查的组合数随叶子数的四次方增长，构建前先估算上界，超过 MAX_SPACE_SIZE 时直接报错。
+"""
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+from fractions import Fraction
+from functools import lru_cache
+from itertools import accumulate
+
+from expression_parser import canonical_form, render
+from rational import Rational
+
+DEFAULT_CACHE_DIR = '.expression_space'
+OPERATORS = ('+', '-', '×', '÷')
+
+# 枚举时检查的候选组合数上界；数值范围5约为910万，可以在十几秒内完成，数值范围6约为2100万
+MAX_SPACE_SIZE = 10_000_000
+
+
+def leaf_values(range_limit):
+    """生成器可能产生的全部数字：1..r-1 的自然数和分母不超过r的真分数（按值去重）"""
+    values = {Fraction(value) for value in range(1, range_limit)}
+    for denominator in range(2, range_limit + 1):
+        for numerator in range(1, denominator):
+            values.add(Fraction(numerator, denominator))
+    return [Rational(value.numerator, value.denominator) for value in sorted(values)]
+
+
+def leaf_count(range_limit):
+    """leaf_values(range_limit) 的长度，不构造数字本身：r-1个自然数，加上每个分母d的φ(d)个最简真分数"""
+    phi = list(range(range_limit + 1))
+    for p in range(2, range_limit + 1):
+        if phi[p] == p:
+            for multiple in range(p, range_limit + 1, p):
+                phi[multiple] -= phi[multiple] // p
+    return max(range_limit - 1, 0) + sum(phi[2:])
+
+
+def _size_bound(leaves, max_operators):
+    levels = [leaves]
+    for operator_count in range(1, max_operators + 1):
+        levels.append(len(OPERATORS) * sum(levels[k] * levels[operator_count - 1 - k] for k in range(operator_count)))
+    return sum(levels[1:])
+
+
+def size_bound(range_limit, max_operators=3):
+    """枚举全部题目时检查的候选组合数的上界：含k个运算符的组合不超过 4 × Σ 第i层 × 第k-1-i层"""
+    # 叶子数不少于自然数的个数，先用它粗算，已经超限时不必再数分数
+    bound = _size_bound(max(range_limit - 1, 0), max_operators)
+    if bound > MAX_SPACE_SIZE:
+        return bound
+    return _size_bound(leaf_count(range_limit), max_operators)
+
+
+def combine(op, left_value, right_value):
+    """按构造规则计算一个节点的值，不合法时返回None"""
+    if op == '+':
+        return left_value + right_value
+    if op == '×':
+        return left_value * right_value
+    if op == '-':
+        if left_value < right_value:
+            return None
+        return left_value - right_value
+    if right_value == 0:
+        return None
+    value = left_value / right_value
+    if value >= 1 and not value.is_integer():
+        return None
+    return value
+
+
+def enumerate_trees(range_limit, max_operators):
+    """返回列表levels，levels[k]为 {规范形式: (语法树, 值)}，包含全部含k个运算符的合法表达式"""
+    levels = [{canonical_form(leaf): (leaf, leaf) for leaf in leaf_values(range_limit)}]
+    for operator_count in range(1, max_operators + 1):
+        level = {}
+        for left_count in range(operator_count):
+            left_level = levels[left_count]
+            right_level = levels[operator_count - 1 - left_count]
+            for left_key, (left, left_value) in left_level.items():
+                for right_key, (right, right_value) in right_level.items():
+                    for op in OPERATORS:
+                        # 交换律等价的组合只保留一个
+                        if op in ('+', '×') and right_key < left_key:
+                            continue
+                        value = combine(op, left_value, right_value)
+                        if value is None:
+                            continue
+                        key = f"({left_key}{op}{right_key})"
+                        if key not in level:
+                            level[key] = ((op, left, right), value)
+        levels.append(level)
+    return levels
+
+
+def line_offsets(data):
+    """每行的起始偏移，末尾追加 len(data) + 1，第k行为 data[offsets[k]:offsets[k + 1] - 1]"""
+    if not data:
+        return array('Q', [1])
+    return array('Q', accumulate((len(line) + 1 for line in data[:].split(b'\n')), initial=0))
+
+
+class ExpressionSpace:
+    """数值范围range_limit、运算符数量1..max_operators的全部合法题目，可按下标访问
+
+    缓存不存在且估算的规模超过 MAX_SPACE_SIZE 时抛出ValueError。
+    """
+
+    def __init__(self, range_limit, max_operators=3, cache_dir=DEFAULT_CACHE_DIR):
+        self.range_limit = range_limit
+        self.max_operators = max_operators
+        self.cache_dir = cache_dir
+        self._maps = []
+        self._offsets = []
+        # 前k层题目数之和，用于把下标定位到所在的层
+        self._starts = []
+        self._size = 0
+        self._load_or_build()
+
+    def _cache_file(self, operator_count):
+        return os.path.join(self.cache_dir, f"r{self.range_limit}_k{operator_count}.txt")
+
+    def _index_file(self, operator_count):
+        return os.path.join(self.cache_dir, f"r{self.range_limit}_k{operator_count}.idx")
+
+    def _load_or_build(self):
+        missing = [k for k in range(1, self.max_operators + 1) if not os.path.exists(self._cache_file(k))]
+        if missing:
+            bound = size_bound(self.range_limit, max(missing))
+            if bound > MAX_SPACE_SIZE:
+                raise ValueError(f"数值范围{self.range_limit}需要枚举约{bound}个组合，超过上限{MAX_SPACE_SIZE}，"
+                                 f"enumerate引擎只适用于较小的数值范围")
+            levels = enumerate_trees(self.range_limit, max(missing))
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for operator_count in missing:
+                content = '\n'.join(render(tree) for tree, _ in levels[operator_count].values()).encode('utf-8')
+                # 先写临时文件再改名，避免中断后留下不完整的缓存；索引在题目文件之后写入
+                path = self._cache_file(operator_count)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(content)
+                os.replace(path + '.tmp', path)
+                self._save_index(operator_count, line_offsets(content))
+
+        for operator_count in range(1, self.max_operators + 1):
+            with open(self._cache_file(operator_count), 'rb') as f:
+                try:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # 空文件无法映射
+                    data = b''
+            offsets = self._load_index(operator_count, data)
+            self._maps.append(data)
+            self._offsets.append(offsets)
+            self._starts.append(self._size)
+            self._size += len(offsets) - 1
+
+    def _save_index(self, operator_count, offsets):
+        path = self._index_file(operator_count)
+        with open(path + '.tmp', 'wb') as f:
+            offsets.tofile(f)
+        os.replace(path + '.tmp', path)
+
+    def _load_index(self, operator_count, data):
+        """读取行偏移索引；索引缺失或与题目文件不符（如旧版本的缓存）时重新扫描并保存"""
+        path = self._index_file(operator_count)
+        offsets = array('Q')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                offsets.fromfile(f, os.fstat(f.fileno()).st_size // offsets.itemsize)
+        if not offsets or offsets[-1] != len(data) + 1:
+            offsets = line_offsets(data)
+            self._save_index(operator_count, offsets)
+        return offsets
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        level = bisect_right(self._starts, index) - 1
+        offsets = self._offsets[level]
+        k = index - self._starts[level]
+        return self._maps[level][offsets[k]:offsets[k + 1] - 1].decode('utf-8')
+
+
+@lru_cache(maxsize=8)
+def expression_space(range_limit, max_operators=3, cache_dir=DEFAULT_CACHE_DIR):
+    """同一进程中相同参数共用一个索引，只从磁盘读取一次"""
+    return ExpressionSpace(range_limit, max_operators, cache_dir)
@@ -1,37 +1,278 @@
+import mmap
+from array import array
+
+# 每攒够这么多行拼接成一个缓冲区写入一次
+WRITE_BUFFER_LINES = 65536
+
+# 题目行末尾的等号
+EXERCISE_SUFFIX = ' ='
+
+# 读取文本文件时使用的编码：记事本等编辑器保存的文件开头可能带有BOM
+READ_ENCODING = 'utf-8-sig'
+BOM = b'\xef\xbb\xbf'
+
+
+def write_numbered(filename, items, suffix=''):
+    """单次遍历写入编号行，每 WRITE_BUFFER_LINES 行拼接后整块写入"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        buffer = []
+        for i, item in enumerate(items, 1):
+            buffer.append(f"{i}. {item}{suffix}\n")
+            if len(buffer) == WRITE_BUFFER_LINES:
+                f.write(''.join(buffer))
+                buffer.clear()
+        f.write(''.join(buffer))
+
+
+class NumberedWriter:
+    """逐行追加编号行，用于流式输出
+
+    写入第一行以及之后每 flush_lines 行时刷新，使下游能立即读到已生成的内容。
+    start为已写入的行数，续写时题号从start + 1开始。
+    """
+
+    def __init__(self, stream, suffix='', flush_lines=1024, start=0):
+        self.stream = stream
+        self.suffix = suffix
+        self.flush_lines = flush_lines
+        self.count = start
+
+    def write(self, item):
+        self.count += 1
+        self.stream.write(f"{self.count}. {item}{self.suffix}\n")
+        if (self.count - 1) % self.flush_lines == 0:
+            self.stream.flush()
+
+
+def split_numbered_line(line):
+    """把 "12. 内容" 形式的行拆分为 (题号, 去掉首尾空白的内容)；不是编号行时返回None"""
+    number, dot, content = line.partition('.')
+    number = number.strip()
+    if not dot or not (number.isascii() and number.isdigit()):
+        return None
+    return int(number), content.strip()
+
+
+def parse_answer_line(line):
+    """去掉 "12. " 形式的题号，返回答案；不是编号行时返回None"""
+    numbered = split_numbered_line(line)
+    return None if numbered is None else numbered[1]
+
+
+def parse_exercise_line(line):
+    """去掉题号和末尾的等号，返回题目；不是编号行时返回None"""
+    numbered = split_numbered_line(line)
+    return None if numbered is None else numbered[1].rsplit('=', 1)[0].strip()
+
+
+class WorksheetReader:
+    """用mmap读取题目或答案文件
+
+    打开时只扫描换行符建立行偏移索引（不解析内容），之后可以直接读取第k题。
+    """
+
+    def __init__(self, filename, exercises=False):
+        self._parse = parse_exercise_line if exercises else parse_answer_line
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._map = b''
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._build_index()
+
+    def _build_index(self):
+        data = self._map
+        size = len(data)
+        find = data.find
+        starts = self._starts
+        ends = self._ends
+        pos = len(BOM) if data[:len(BOM)] == BOM else 0
+        while pos < size:
+            end = find(b'\n', pos)
+            if end == -1:
+                end = size
+            if end > pos:
+                starts.append(pos)
+                ends.append(end)
+            pos = end + 1
+
+    def __len__(self):
+        return len(self._starts)
+
+    def line(self, k):
+        """第k行（从0开始）的原始文本"""
+        return self._map[self._starts[k]:self._ends[k]].decode('utf-8')
+
+    def __getitem__(self, k):
+        """第k题（从0开始）去掉题号后的内容"""
+        return self._parse(self.line(k))
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def save_exercises(exercises, filename='Exercises.txt'):
+    write_numbered(filename, exercises, EXERCISE_SUFFIX)
+
+
+def save_answers(answers, filename='Answers.txt'):
+    write_numbered(filename, answers)
+
+
+def iter_exercises(filename):
+    """逐行读取题目文件，不把整个文件载入内存"""
+    for _, exercise in iter_numbered_exercises(filename):
+        yield exercise
+
+
+def iter_answers(filename):
+    for _, answer in iter_numbered_answers(filename):
+        yield answer
+
+
+def iter_numbered_exercises(filename):
+    """逐行产生 (题号, 题目)"""
+    for number, content in iter_numbered_lines(filename):
+        yield number, content.rsplit('=', 1)[0].strip()
+
+
+def iter_numbered_answers(filename):
+    """逐行产生 (题号, 答案)"""
+    return iter_numbered_lines(filename)
+
+
+def iter_numbered_lines(filename):
+    with open(filename, 'r', encoding=READ_ENCODING) as f:
+        for line in f:
+            numbered = split_numbered_line(line)
+            if numbered is not None:
+                yield numbered
+
+
+def pair_by_number(items, answers):
+    """按题号把 (题号, 题目) 序列与 (题号, 答案) 序列配对，按题目的顺序产生 (题号, 题目, 答案)
+
+    答案缺少某题时该题的答案为None，没有对应题目的答案被忽略，同一题号有多个答案时取第一个。
+    两个文件通常按同样的顺序编号，答案按需读取，只暂存尚未配对的答案。
+    """
+    answers = iter(answers)
+    pending = {}
+    for number, item in items:
+        if number in pending:
+            yield number, item, pending.pop(number)
+            continue
+        for answer_number, answer in answers:
+            if answer_number == number:
+                break
+            pending.setdefault(answer_number, answer)
+        else:
+            answer = None
+        yield number, item, answer
+
+
+def iter_pairs(exercise_file, answer_file):
+    """按题号配对题目文件和答案文件，逐道产生 (题号, 题目, 答案)"""
+    return pair_by_number(iter_numbered_exercises(exercise_file), iter_numbered_answers(answer_file))
+
+
+def load_exercises(filename):
+    return list(iter_exercises(filename))
+
+
+def load_answers(filename):
+    return list(iter_answers(filename))
+
+
+def open_exercises(filename):
+    """以mmap方式打开题目文件，支持按下标直接读取第k题"""
+    return WorksheetReader(filename, exercises=True)
+
+
+def open_answers(filename):
+    return WorksheetReader(filename)
+
+
+def save_grade(correct, wrong, filename='Grade.txt'):
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"Correct: {len(correct)} ({', '.join(map(str, correct))})\n")
+        f.write(f"Wrong: {len(wrong)} ({', '.join(map(str, wrong))})\n")
+
+
+class GradeWriter:
+    """增量写入批改结果
+
+    题号边批改边写入临时文件，结束时再拼接成 Grade.txt 的格式，内存占用与题目数量无关。
+    缺失或无法解析的答案计为错误，题号另外记录在 Invalid 行中；没有这类答案时不写该行。
+    """
+
+    def __init__(self, filename='Grade.txt'):
+        import tempfile
+
+        self.filename = filename
+        self.correct_count = 0
+        self.wrong_count = 0
+        self.invalid_count = 0
+        self._correct = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._wrong = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._invalid = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def add(self, index, is_correct, invalid=False):
+        if is_correct:
+            self._correct.write(f", {index}" if self.correct_count else str(index))
+            self.correct_count += 1
+        else:
+            self._wrong.write(f", {index}" if self.wrong_count else str(index))
+            self.wrong_count += 1
+        if invalid:
+            self._invalid.write(f", {index}" if self.invalid_count else str(index))
+            self.invalid_count += 1
+
+    def close(self):
+        import shutil
+
+        sections = [('Correct', self.correct_count, self._correct), ('Wrong', self.wrong_count, self._wrong)]
+        if self.invalid_count:
+            sections.append(('Invalid', self.invalid_count, self._invalid))
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            for label, count, spool in sections:
+                f.write(f"{label}: {count} (")
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                f.write(")\n")
+        for spool in (self._correct, self._wrong, self._invalid):
+            spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class FileManager:
-    @staticmethod
-    def save_exercises(exercises, filename):
-        with open(filename, 'w', encoding='utf-8') as f:
-            for i, exercise in enumerate(exercises, 1):
-                f.write(f"{i}. {exercise} = \n")
-
-    @staticmethod
-    def save_answers(answers, filename):
-        with open(filename, 'w', encoding='utf-8') as f:
-            for i, answer in enumerate(answers, 1):
-                f.write(f"{i}. {answer}\n")
-
-    @staticmethod
-    def load_exercises(filename):
-        exercises = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                # 移除题号，提取表达式
-                exercise = line.split('.', 1)[1].strip()
-                exercise = exercise.rsplit('=', 1)[0].strip()
-                exercises.append(exercise)
-        return exercises
-
-    @staticmethod
-    def load_answers(filename):
-        answers = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                answer = line.split('.', 1)[1].strip()
-                answers.append(answer)
-        return answers
-
-    @staticmethod
-    def save_grade(grade_info, filename):
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(grade_info)
\ No newline at end of file
+    """兼容旧接口，各方法直接调用本模块的同名函数"""
+
+    save_exercises = staticmethod(save_exercises)
+    save_answers = staticmethod(save_answers)
+    iter_exercises = staticmethod(iter_exercises)
+    iter_answers = staticmethod(iter_answers)
+    load_exercises = staticmethod(load_exercises)
+    load_answers = staticmethod(load_answers)
+    open_exercises = staticmethod(open_exercises)
+    open_answers = staticmethod(open_answers)
+    save_grade = staticmethod(save_grade)
@@ -1,102 +1,317 @@
 import random
-from fractions import Fraction
 
+from core import DuplicateChecker, parse_answer
+from evaluation_cache import shared_cache
+from expression_parser import (ConstraintError, canonical_key, evaluate_checked, normalize_expression, parse,
+                               render)
+from expression_space import DEFAULT_CACHE_DIR, expression_space
+from operand_table import operand_table
+from rational import Rational
 
-class ExpressionGenerator:
-    def __init__(self, range_limit):
+
+class GeneratorBase:
+    """各生成引擎共用的部分：独立的随机数生成器和按规范形式查重的已生成题目集合
+
+    max_denominator、max_value为每个中间结果（约分后）分母和绝对值的上限，None表示不限制。
+    on_reject不为None时，每个不合法的候选（包括生成时内部重试掉的）都以拒绝原因调用它一次，用于统计。
+    """
+
+    def __init__(self, range_limit, seed=None, max_denominator=None, max_value=None):
         self.range_limit = range_limit
         self.operators = ['+', '-', '×', '÷']
+        self.random = random.Random(seed)
+        self.duplicates = DuplicateChecker()
+        self.max_denominator = max_denominator
+        self.max_value = max_value
+        self.on_reject = None
+
+    @property
+    def generated_expressions(self):
+        """已生成题目的规范形式集合"""
+        return self.duplicates.keys
+
+    def canonical_key(self, expression):
+        return canonical_key(expression)
+
+    def is_duplicate(self, expression):
+        return expression in self.duplicates
+
+    def generate_checked(self):
+        """生成一道候选题目，返回 (表达式, 不合法的原因)，合法时原因为None"""
+        expression = self.generate_expression()
+        reason = self.rejection_reason(expression)
+        if reason is not None and self.on_reject is not None:
+            self.on_reject(reason)
+        return expression, reason
+
+    def reset(self):
+        """清空已生成题目的记录，开始生成新的一份题目"""
+        self.duplicates = DuplicateChecker()
+
+    def get_state(self):
+        """随机数状态和已生成题目的规范形式，用于写入检查点"""
+        return {'random': self.random.getstate(), 'generated_expressions': self.duplicates.keys}
+
+    def set_state(self, state):
+        self.random.setstate(state['random'])
+        self.duplicates.keys = state['generated_expressions']
+
+
+class ExpressionGenerator(GeneratorBase):
+    """随机生成题目文本后再校验（random引擎）"""
+
+    def __init__(self, range_limit, seed=None, max_denominator=None, max_value=None):
+        super().__init__(range_limit, seed, max_denominator, max_value)
+        self.operand_table = operand_table(range_limit)
 
-    def generate_number(self, is_fraction=False):
-        """生成数字，可能是自然数或真分数"""
-        if not is_fraction or random.random() < 0.7:  # 70%概率生成整数
-            return str(random.randint(0, self.range_limit - 1))
+    def generate_number(self, allow_fraction=True):
+        if not allow_fraction or self.random.random() < 0.7:
+            return str(self.random.randint(1, self.range_limit - 1))
         else:
-            # 生成真分数
-            denominator = random.randint(2, self.range_limit)
-            numerator = random.randint(1, denominator - 1)
+            denominator = self.random.randint(2, self.range_limit)
+            numerator = self.random.randint(1, denominator - 1)
             return f"{numerator}/{denominator}"
 
-    def generate_operator(self):
-        return random.choice(self.operators)
+    def generate_operator_count(self):
+        return self.random.randint(1, 3)
 
-    def generate_expression(self, max_operators=3, current_operators=0, has_brackets=False):
-        """生成表达式，递归实现"""
-        if current_operators >= max_operators:
-            return self.generate_number(random.random() < 0.3)
+    def generate_expression(self):
+        return self.generate_checked()[0]
 
-        # 决定是否添加括号
-        use_brackets = not has_brackets and random.random() < 0.3 and current_operators > 0
+    def generate_checked(self):
+        """生成时已经校验过，直接返回校验结果，调用方不必再校验一次"""
+        return self.generate_checked_with_operator_count(self.generate_operator_count())
 
-        if use_brackets:
-            left = "("
-            right = ")"
+    def generate_expression_with_operator_count(self, operator_count, max_attempts=100):
+        return self.generate_checked_with_operator_count(operator_count, max_attempts)[0]
+
+    def generate_checked_with_operator_count(self, operator_count, max_attempts=100):
+        """生成含operator_count个运算符的题目，不合法时重试，返回 (表达式, 不合法的原因)
+
+        重试max_attempts次仍不合法时返回最后一个候选及其原因。
+        """
+        if operator_count < 1 or operator_count > 3:
+            raise ValueError("运算符数量必须在1-3之间")
+
+        for attempt in range(max_attempts):
+            operators = [self.random.choice(self.operators) for _ in range(operator_count)]
+            operands = self.generate_operands(operators)
+            expression = self.build_expression(operands, operators)
+            reason = self.rejection_reason(expression)
+            if reason is None:
+                break
+            if self.on_reject is not None:
+                self.on_reject(reason)
+        return expression, reason
+
+    def generate_operands(self, operators):
+        """依次生成操作数；减号和除号后的操作数直接从预计算表中选取，保证相邻两数的运算合法"""
+        operands = [self.generate_number()]
+        for operator in operators:
+            if operator in ('-', '÷'):
+                operands.append(self.operand_table.pick_right(operator, operands[-1], self.random))
+            else:
+                operands.append(self.generate_number())
+        return operands
+
+    def build_expression(self, operands, operators):
+        if len(operators) == 1:
+            return f"{operands[0]} {operators[0]} {operands[1]}"
+        elif len(operators) == 2:
+            if self.random.random() < 0.5:
+                return f"{operands[0]} {operators[0]} {operands[1]} {operators[1]} {operands[2]}"
+            else:
+                return f"({operands[0]} {operators[0]} {operands[1]}) {operators[1]} {operands[2]}"
         else:
-            left = ""
-            right = ""
+            bracket_type = self.random.randint(1, 3)
+            if bracket_type == 1:
+                return f"({operands[0]} {operators[0]} {operands[1]}) {operators[1]} {operands[2]} {operators[2]} {operands[3]}"
+            elif bracket_type == 2:
+                return f"{operands[0]} {operators[0]} ({operands[1]} {operators[1]} {operands[2]}) {operators[2]} {operands[3]}"
+            else:
+                return f"({operands[0]} {operators[0]} {operands[1]} {operators[1]} {operands[2]}) {operators[2]} {operands[3]}"
 
-        # 生成左表达式
-        left_expr = self.generate_expression(max_operators, current_operators + 1, use_brackets)
+    def validate_expression(self, expression):
+        return self.rejection_reason(expression) is None
 
-        # 生成运算符
-        operator = self.generate_operator()
+    def rejection_reason(self, expression):
+        """返回表达式不合法的原因，合法时返回None
 
-        # 生成右表达式，确保运算合法性
-        right_expr = self.generate_right_expression(left_expr, operator, max_operators, current_operators + 1,
-                                                    use_brackets)
+        逐节点检查（见 expression_parser.evaluate_checked），第一个违反约束的节点处立即停止计算；
+        合法表达式的值放入求值缓存，随后计算答案时直接命中。
+        """
+        operator_count = sum(1 for char in expression if char in self.operators)
+        if operator_count > 3:
+            return 'too_many_operators'
 
-        expression = f"{left}{left_expr} {operator} {right_expr}{right}"
+        try:
+            shared_cache.evaluate_checked(expression, self.max_denominator, self.max_value)
+        except ConstraintError as error:
+            return error.reason
+        except (ValueError, ZeroDivisionError):
+            return 'not_computable'
+        return None
 
-        # 30%概率生成更复杂的表达式
-        if current_operators < max_operators - 1 and random.random() < 0.3:
-            next_operator = self.generate_operator()
-            next_expr = self.generate_expression(max_operators, current_operators + 2, has_brackets)
-            expression = f"({expression}) {next_operator} {next_expr}"
+    # 以下方法为兼容旧接口保留，调用求值缓存、core 和逐节点校验
 
-        return expression
+    def build_expression_with_validation(self, operands, operators, max_attempts=100):
+        """用给定的操作数构造合法的表达式，不合法时重新选取运算符"""
+        for attempt in range(max_attempts):
+            expression = self.build_expression(operands, operators)
+            if self.validate_expression(expression):
+                return expression
+            operators = [self.random.choice(self.operators) for _ in operators]
+        return self.build_expression(operands, operators)
 
-    def generate_right_expression(self, left_expr, operator, max_operators, current_operators, has_brackets):
-        """生成右表达式，确保运算合法性"""
-        while True:
-            right_expr = self.generate_expression(max_operators, current_operators, has_brackets)
-
-            # 对于减法，确保左表达式不小于右表达式
-            if operator == '-':
-                try:
-                    # 这里需要计算表达式的值进行比较
-                    # 简化处理：如果是数字直接比较
-                    if self.is_number(left_expr) and self.is_number(right_expr):
-                        left_val = self.parse_number(left_expr)
-                        right_val = self.parse_number(right_expr)
-                        if left_val >= right_val:
-                            return right_expr
-                    else:
-                        # 对于复杂表达式，暂时接受（实际项目需要更复杂的处理）
-                        return right_expr
-                except:
-                    continue
-            # 对于除法，确保除数不为零且结果为真分数
-            elif operator == '÷':
-                try:
-                    if self.is_number(right_expr):
-                        right_val = self.parse_number(right_expr)
-                        if right_val != 0:
-                            return right_expr
-                    else:
-                        return right_expr
-                except:
-                    continue
-            else:
-                return right_expr
+    def validate_division_results(self, expression, result=None):
+        """表达式中的除法是否都合法（除数不为零，结果为真分数或整数）"""
+        return self.rejection_reason(expression) not in ('division_by_zero', 'improper_division')
+
+    def calculate_expression(self, expression):
+        try:
+            return shared_cache.evaluate(expression)
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    def parse_fraction(self, num_str):
+        return parse_answer(num_str)
+
+    def normalize_expression(self, expression):
+        return normalize_expression(expression)
 
-    def is_number(self, expr):
-        """判断是否是数字（整数或分数）"""
-        return expr.replace('/', '').replace('-', '').isdigit()
 
-    def parse_number(self, num_str):
-        """解析数字字符串为数值"""
-        if '/' in num_str:
-            parts = num_str.split('/')
-            return Fraction(int(parts[0]), int(parts[1]))
+class ConstructiveExpressionGenerator(GeneratorBase):
+    """自底向上构造表达式树，同时记录每棵子树的精确值
+
+    每个节点的运算符都从当前左右子树取值下合法的运算中选取：
+    减法结果非负，除数不为零，除法结果为真分数或整数。
+    因此生成的每个候选表达式第一次就是合法的，无需拒绝重试。
+    """
+
+    def generate_number(self):
+        """生成自然数（70%）或真分数"""
+        if self.random.random() < 0.7:
+            return Rational(self.random.randint(1, self.range_limit - 1))
+        denominator = self.random.randint(2, self.range_limit)
+        numerator = self.random.randint(1, denominator - 1)
+        return Rational(numerator, denominator)
+
+    def generate_operator_count(self):
+        return self.random.randint(1, 3)
+
+    def build_tree(self, operator_count):
+        """构造含operator_count个运算符的表达式树，返回 (语法树, 值)"""
+        if operator_count == 0:
+            value = self.generate_number()
+            return value, value
+
+        left_count = self.random.randint(0, operator_count - 1)
+        left, left_value = self.build_tree(left_count)
+        right, right_value = self.build_tree(operator_count - 1 - left_count)
+
+        operator = self.random.choice(self.operators)
+        if operator == '÷' and left_value == 0 and right_value == 0:
+            operator = self.random.choice(('+', '-', '×'))
+
+        if operator == '+':
+            value = left_value + right_value
+        elif operator == '×':
+            value = left_value * right_value
+        elif operator == '-':
+            # 交换左右子树使被减数不小于减数
+            if left_value < right_value:
+                left, right, left_value, right_value = right, left, right_value, left_value
+            value = left_value - right_value
         else:
-            return Fraction(int(num_str))
\ No newline at end of file
+            # 取两种方向中除数非零、结果为真分数或整数的一种
+            if right_value == 0 or (left_value >= right_value and not (left_value / right_value).is_integer()):
+                left, right, left_value, right_value = right, left, right_value, left_value
+            value = left_value / right_value
+
+        if self.max_denominator is not None or self.max_value is not None:
+            value = value.reduced()
+            if ((self.max_denominator is not None and value.denominator > self.max_denominator)
+                    or (self.max_value is not None and abs(value.numerator) > self.max_value * value.denominator)):
+                raise ConstraintError('too_large')
+
+        return (operator, left, right), value
+
+    def generate(self):
+        """生成一道合法题目，返回 (表达式, 精确值)
+
+        设置了中间结果上限时，某个节点超出上限就放弃这棵树重新构造。
+        """
+        while True:
+            try:
+                tree, value = self.build_tree(self.generate_operator_count())
+            except ConstraintError as error:
+                if self.on_reject is not None:
+                    self.on_reject(error.reason)
+                continue
+            return render(tree), value
+
+    def generate_expression(self):
+        return self.generate()[0]
+
+    def generate_checked(self):
+        """构造出的题目总是合法的，不必校验"""
+        return self.generate_expression(), None
+
+    def validate_expression(self, expression):
+        """按构造规则逐节点检查表达式"""
+        return self.rejection_reason(expression) is None
+
+    def rejection_reason(self, expression):
+        """返回表达式不合法的原因，合法时返回None"""
+        try:
+            evaluate_checked(parse(expression), self.max_denominator, self.max_value)
+        except ConstraintError as error:
+            return error.reason
+        except (ValueError, ZeroDivisionError):
+            return 'not_computable'
+        return None
+
+
+class EnumerativeExpressionGenerator(ConstructiveExpressionGenerator):
+    """从预先枚举的全部合法题目中不放回地随机抽取
+
+    适用于数值范围较小的情况：题目总数已知，请求数量超过总数时可以立即报错；
+    每次抽取是O(1)的稀疏Fisher-Yates洗牌，抽取N道题目只需O(N)时间和内存。
+    """
+
+    def __init__(self, range_limit, max_operators=3, cache_dir=DEFAULT_CACHE_DIR, seed=None):
+        super().__init__(range_limit, seed)
+        self.space = expression_space(range_limit, max_operators, cache_dir)
+        self.drawn = 0
+        self._swaps = {}
+
+    def capacity(self):
+        """不同题目的最大数量"""
+        return len(self.space)
+
+    def generate_expression(self):
+        total = len(self.space)
+        if self.drawn >= total:
+            raise ValueError(f"数值范围{self.range_limit}内的{total}道不同题目已全部生成")
+        # 把第drawn个位置与随机位置j交换，只记录被交换过的位置
+        j = self.random.randrange(self.drawn, total)
+        index = self._swaps.get(j, j)
+        self._swaps[j] = self._swaps.pop(self.drawn, self.drawn)
+        self.drawn += 1
+        return self.space[index]
+
+    def reset(self):
+        super().reset()
+        self.drawn = 0
+        self._swaps = {}
+
+    def get_state(self):
+        state = super().get_state()
+        state['drawn'] = self.drawn
+        state['swaps'] = self._swaps
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self.drawn = state['drawn']
+        self._swaps = state['swaps']
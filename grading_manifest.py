@@ -0,0 +1,88 @@
+"""增量批改的清单文件
+
+清单记录上一次批改时每行 (题目, 学生答案) 的64位内容哈希和批改结果。
+再次批改时哈希不变的行直接沿用原来的结果，只有新增或改动的行需要重新求值，
+Grade.txt 由全部结果重新拼接写出。
+
+文件结构（小端）：
+    头部    8字节魔数 + uint64 行数
+    哈希    每行一个uint64
+    结果    每行一个uint8（0 错误，1 正确，2 无法解析）
+"""
+import os
+import struct
+from array import array
+from hashlib import blake2b
+
+MAGIC = b'GRDMAN01'
+HEADER = struct.Struct('<8sQ')
+
+WRONG = 0
+CORRECT = 1
+INVALID = 2
+
+
+def line_hash(exercise, answer):
+    """一行题目和答案的内容哈希，与题号无关"""
+    digest = blake2b(f"{exercise}\0{answer}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def verdict(is_correct, invalid):
+    if invalid:
+        return INVALID
+    return CORRECT if is_correct else WRONG
+
+
+class GradingManifest:
+    def __init__(self, hashes=None, verdicts=None):
+        self.hashes = array('Q') if hashes is None else hashes
+        self.verdicts = array('B') if verdicts is None else verdicts
+        self._by_hash = None
+
+    @classmethod
+    def load(cls, filename):
+        """读取清单；文件不存在或格式不对时返回空清单，此时所有行都重新批改"""
+        if not os.path.exists(filename):
+            return cls()
+        with open(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return cls()
+            magic, count = HEADER.unpack(header)
+            if magic != MAGIC:
+                return cls()
+            hashes = array('Q')
+            verdicts = array('B')
+            try:
+                hashes.fromfile(f, count)
+                verdicts.fromfile(f, count)
+            except EOFError:
+                return cls()
+        return cls(hashes, verdicts)
+
+    def save(self, filename):
+        # 先写临时文件再改名，中断时旧的清单保持完整
+        with open(filename + '.tmp', 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.hashes)))
+            self.hashes.tofile(f)
+            self.verdicts.tofile(f)
+        os.replace(filename + '.tmp', filename)
+
+    def lookup(self, k, digest):
+        """第k行（从0开始）哈希为digest时上一次的结果，没有记录时返回None
+
+        先比较同一行号，行号对不上（如插入或删除了行）时再按哈希查找。
+        """
+        if k < len(self.hashes) and self.hashes[k] == digest:
+            return self.verdicts[k]
+        if self._by_hash is None:
+            self._by_hash = dict(zip(self.hashes, self.verdicts))
+        return self._by_hash.get(digest)
+
+    def append(self, digest, result):
+        self.hashes.append(digest)
+        self.verdicts.append(result)
+
+    def __len__(self):
+        return len(self.hashes)
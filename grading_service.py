@@ -0,0 +1,240 @@
+"""常驻批改服务
+
+进程常驻，求值缓存一直保持预热，避免每次批改都重新启动Python、读写文件。
+同时到达的请求合并成一批：一批中相同的题目只求值一次。
+
+两种接入方式：
+    python grading_service.py --port 8765            本机HTTP，POST /grade，GET /stats
+    python grading_service.py --unix /tmp/grade.sock  Unix socket，每行一个JSON请求，返回一行JSON
+
+请求：{"items": [{"exercise": "1/2 + 1/3", "answer": "5/6"}, ...]}
+响应：{"results": [{"correct": true, "expected": "5/6", "invalid": false}, ...]}
+无法计算的题目 expected 为 null，correct 为 false；无法解析的学生答案 invalid 为 true。
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from core import format_value, grade_answer
+from evaluation_cache import shared_cache
+
+MAX_BATCH_ITEMS = 4096
+MAX_BATCH_DELAY = 0.002
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+def grade_items(items):
+    """批改一批 (题目, 学生答案)，返回每题的 {correct, expected}"""
+    values = {}
+    for exercise, _ in items:
+        if exercise not in values:
+            try:
+                values[exercise] = shared_cache.evaluate(exercise)
+            except Exception:
+                values[exercise] = None
+
+    expected = {exercise: None if value is None else format_value(value) for exercise, value in values.items()}
+    results = []
+    for exercise, answer in items:
+        is_correct, invalid = grade_answer(answer, values[exercise])
+        results.append({'correct': is_correct, 'expected': expected[exercise], 'invalid': invalid})
+    return results
+
+
+class GradingBatcher:
+    """把并发到达的批改请求合并成批处理
+
+    第一个请求到达后最多再等待max_delay秒或凑满max_items道题，然后一次性批改，
+    再把结果按请求拆分返回。
+    """
+
+    def __init__(self, max_items=MAX_BATCH_ITEMS, max_delay=MAX_BATCH_DELAY):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.items = 0
+        self.batches = 0
+
+    async def grade(self, items):
+        """提交一个请求的全部题目，返回对应的结果列表"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((items, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            count = len(jobs[0][0])
+            deadline = loop.time() + self.max_delay
+            while count < self.max_items:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                jobs.append(job)
+                count += len(job[0])
+            self._grade_jobs(jobs)
+
+    def _grade_jobs(self, jobs):
+        items = [item for job_items, _ in jobs for item in job_items]
+        try:
+            results = grade_items(items)
+        except Exception as e:
+            for _, future in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.requests += len(jobs)
+        self.items += len(items)
+        self.batches += 1
+        start = 0
+        for job_items, future in jobs:
+            if not future.done():
+                future.set_result(results[start:start + len(job_items)])
+            start += len(job_items)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'items': self.items,
+            'batches': self.batches,
+            'evaluation_cache': shared_cache.stats(),
+        }
+
+
+def parse_request(body):
+    """解析请求体，返回 [(题目, 学生答案)]，格式错误时抛出ValueError"""
+    request = json.loads(body)
+    if not isinstance(request, dict) or not isinstance(request.get('items'), list):
+        raise ValueError("请求必须是包含items列表的JSON对象")
+    items = []
+    for item in request['items']:
+        if not isinstance(item, dict):
+            raise ValueError("items中的每一项必须是JSON对象")
+        items.append((str(item.get('exercise', '')), str(item.get('answer', ''))))
+    return items
+
+
+class GradingService:
+    def __init__(self, batcher=None):
+        self.batcher = batcher or GradingBatcher()
+        self.started = time.time()
+
+    async def handle(self, body):
+        """处理一个请求体，返回 (状态码, 响应对象)"""
+        try:
+            items = parse_request(body)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 200, {'results': await self.batcher.grade(items)}
+
+    def stats(self):
+        return dict(self.batcher.stats(), uptime_seconds=time.time() - self.started)
+
+    async def handle_lines(self, reader, writer):
+        """Unix socket连接：每行一个JSON请求，按顺序逐行返回"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                _, response = await self.handle(line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http(self, reader, writer):
+        """最小的HTTP/1.1实现，支持keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # Content-Length必须是非负整数，否则与缺少请求路径一样按错误的请求处理
+                length = headers.get('content-length', '') or '0'
+                length = int(length) if length.isascii() and length.isdigit() else -1
+                if len(parts) < 2 or not 0 <= length <= MAX_BODY_SIZE:
+                    self._write_http(writer, 400, {'error': '错误的请求'}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                method, path = parts[0], parts[1]
+                if method == 'POST' and path == '/grade':
+                    status, response = await self.handle(body)
+                elif method == 'GET' and path == '/stats':
+                    status, response = 200, self.stats()
+                else:
+                    status, response = 404, {'error': f'未知路径: {method} {path}'}
+
+                close = headers.get('connection', '').lower() == 'close'
+                self._write_http(writer, status, response, close)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_http(writer, status, response, close=False):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}
+        body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {reasons[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+async def serve(host='127.0.0.1', port=8765, unix_path=None):
+    service = GradingService()
+    batch_task = asyncio.create_task(service.batcher.run())
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_lines, path=unix_path)
+        print(f"批改服务已启动: unix:{unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle_http, host, port)
+        print(f"批改服务已启动: http://{host}:{port}/grade")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻批改服务')
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='HTTP监听端口')
+    parser.add_argument('--unix', help='改为监听该Unix socket路径')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,335 +1,622 @@
-import random
-import argparse
-from fractions import Fraction
-import re
+import os
+import sys
+import time
+from collections import deque
+from contextlib import closing
+from itertools import islice
 
+from batch_eval import evaluate_batch
+from binary_worksheet import BinaryWorksheet, is_binary_worksheet, save_binary
+from core import answers_equal, format_value, grade_answer, parse_answer
+from evaluation_cache import shared_cache
+# FileManager 为兼容旧接口保留
+from file_io import (EXERCISE_SUFFIX, FileManager, GradeWriter, NumberedWriter, iter_numbered_answers, iter_pairs,
+                     pair_by_number, save_answers, save_exercises)
+from profiling import RunStats, timer
 
-class ExpressionGenerator:
-    def __init__(self, range_limit):
-        self.range_limit = range_limit
-        self.operators = ['+', '-', '×', '÷']
-        self.generated_expressions = set()
+# argparse、random、fractions、生成器、多进程和批改用的临时文件等模块在用到时才导入，单次批改不必为生成代码付出启动时间。
 
-    def generate_number(self, allow_fraction=True):
-        if not allow_fraction or random.random() < 0.7:
-            return str(random.randint(1, self.range_limit - 1))
-        else:
-            denominator = random.randint(2, self.range_limit)
-            numerator = random.randint(1, denominator - 1)
-            return f"{numerator}/{denominator}"
-
-    def generate_operator_count(self):
-        return random.randint(1, 3)
-
-    def generate_expression(self):
-        operator_count = self.generate_operator_count()
-        return self.generate_expression_with_operator_count(operator_count)
-
-    def generate_expression_with_operator_count(self, operator_count):
-        if operator_count < 1 or operator_count > 3:
-            raise ValueError("运算符数量必须在1-3之间")
-
-        operand_count = operator_count + 1
-        operands = [self.generate_number() for _ in range(operand_count)]
-        operators = [random.choice(self.operators) for _ in range(operator_count)]
-
-        expression = self.build_expression_with_validation(operands, operators)
-        return expression
-
-    def build_expression_with_validation(self, operands, operators, max_attempts=100):
-        for attempt in range(max_attempts):
-            expression = self.build_expression(operands, operators)
-            if self.validate_expression(expression):
-                return expression
-            operators = [random.choice(self.operators) for _ in range(len(operators))]
-        return self.build_expression(operands, operators)
-
-    def build_expression(self, operands, operators):
-        if len(operators) == 1:
-            return f"{operands[0]} {operators[0]} {operands[1]}"
-        elif len(operators) == 2:
-            if random.random() < 0.5:
-                return f"{operands[0]} {operators[0]} {operands[1]} {operators[1]} {operands[2]}"
-            else:
-                return f"({operands[0]} {operators[0]} {operands[1]}) {operators[1]} {operands[2]}"
-        else:
-            bracket_type = random.randint(1, 3)
-            if bracket_type == 1:
-                return f"({operands[0]} {operators[0]} {operands[1]}) {operators[1]} {operands[2]} {operators[2]} {operands[3]}"
-            elif bracket_type == 2:
-                return f"{operands[0]} {operators[0]} ({operands[1]} {operators[1]} {operands[2]}) {operators[2]} {operands[3]}"
-            else:
-                return f"({operands[0]} {operators[0]} {operands[1]} {operators[1]} {operands[2]}) {operators[2]} {operands[3]}"
+# 多进程生成时每批的题目数；固定不变，使指定种子时的结果与进程数和是否流式输出无关
+PARALLEL_BATCH_SIZE = 1000
 
-    def validate_expression(self, expression):
-        try:
-            operator_count = sum(1 for char in expression if char in self.operators)
-            if operator_count > 3:
-                return False
 
-            result = self.calculate_expression(expression)
-            if result is None or result < 0:
-                return False
+def __getattr__(name):
+    """兼容旧接口：ExpressionGenerator 已移到 generator 模块，按需导入"""
+    if name == 'ExpressionGenerator':
+        from generator import ExpressionGenerator
 
-            if not self.validate_division_results(expression, result):
-                return False
+        return ExpressionGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-            return True
-        except:
-            return False
 
-    def validate_division_results(self, expression, result):
-        divisions = re.findall(r'(\S+)\s*÷\s*(\S+)', expression)
-        for left, right in divisions:
-            try:
-                left_val = self.parse_fraction(left)
-                right_val = self.parse_fraction(right)
-                if right_val == 0:
-                    return False
-                division_result = left_val / right_val
-                if division_result >= 1 and division_result.denominator != 1:
-                    return False
-            except:
-                continue
-        return True
-
-    def calculate_expression(self, expression):
-        try:
-            py_expr = self.convert_to_python_expression(expression)
-            result = eval(py_expr, {"Fraction": Fraction, "__builtins__": {}})
-            return result
-        except:
-            return None
-
-    def convert_to_python_expression(self, expression):
-        py_expr = expression.replace('×', '*').replace('÷', '/')
-
-        def replace_number(match):
-            num_str = match.group()
-            if '/' in num_str:
-                parts = num_str.split('/')
-                return f"Fraction({parts[0]}, {parts[1]})"
-            else:
-                return f"Fraction({num_str})"
-
-        py_expr = re.sub(r'\b\d+\b', replace_number, py_expr)
-        py_expr = re.sub(r'\b\d+/\d+\b', replace_number, py_expr)
-
-        return py_expr
-
-    def parse_fraction(self, num_str):
-        if '/' in num_str:
-            parts = num_str.split('/')
-            return Fraction(int(parts[0]), int(parts[1]))
-        else:
-            return Fraction(int(num_str))
-
-    def normalize_expression(self, expression):
-        return expression.replace(' ', '')
-
-    def is_duplicate(self, expression):
-        normalized = self.normalize_expression(expression)
-        if normalized in self.generated_expressions:
-            return True
-        for expr in self.generated_expressions:
-            if self.is_commutative_duplicate(normalized, expr):
-                return True
-        return False
-
-    def is_commutative_duplicate(self, expr1, expr2):
-        if '+' in expr1 and '+' in expr2:
-            parts1 = re.split(r'\+', expr1.replace('(', '').replace(')', ''))
-            parts2 = re.split(r'\+', expr2.replace('(', '').replace(')', ''))
-            if set(parts1) == set(parts2):
-                return True
-        if '×' in expr1 and '×' in expr2:
-            parts1 = re.split(r'×', expr1.replace('(', '').replace(')', ''))
-            parts2 = re.split(r'×', expr2.replace('(', '').replace(')', ''))
-            if set(parts1) == set(parts2):
-                return True
-        return False
+class ArithmeticCalculator:
+    """兼容旧接口：求值、格式化和比较答案都调用 core 中的实现"""
 
+    format_fraction = staticmethod(format_value)
+    compare_answers = staticmethod(answers_equal)
 
-class ArithmeticCalculator:
     @staticmethod
     def calculate(expression):
         try:
-            py_expr = expression.replace('×', '*').replace('÷', '/')
-
-            def replace_number(match):
-                num_str = match.group()
-                if '/' in num_str:
-                    parts = num_str.split('/')
-                    return f"Fraction({parts[0]}, {parts[1]})"
-                else:
-                    return f"Fraction({num_str})"
-
-            py_expr = re.sub(r'\b\d+\b', replace_number, py_expr)
-            py_expr = re.sub(r'\b\d+/\d+\b', replace_number, py_expr)
-
-            result = eval(py_expr, {"Fraction": Fraction, "__builtins__": {}})
-            return ArithmeticCalculator.format_fraction(result)
+            return format_value(shared_cache.evaluate(expression))
         except Exception as e:
             print(f"计算错误: {expression}, 错误: {e}")
             return None
 
     @staticmethod
-    def format_fraction(value):
-        if isinstance(value, Fraction):
-            if value.denominator == 1:
-                return str(value.numerator)
-
-            if value.numerator >= value.denominator:
-                whole = value.numerator // value.denominator
-                remainder = value.numerator % value.denominator
-                if remainder == 0:
-                    return str(whole)
-                else:
-                    return f"{whole}'{remainder}/{value.denominator}"
-            else:
-                return f"{value.numerator}/{value.denominator}"
-        elif isinstance(value, int):
-            return str(value)
-        else:
-            try:
-                frac = Fraction(value).limit_denominator()
-                return ArithmeticCalculator.format_fraction(frac)
-            except:
-                return str(value)
+    def calculate_batch(expressions):
+        """批量计算一组表达式，返回格式化后的答案列表，无法计算的位置为None"""
+        return [None if value is None else format_value(value) for value in evaluate_batch(expressions)]
 
-    @staticmethod
-    def compare_answers(answer1, answer2):
-        try:
-            def parse_answer(ans):
-                if "'" in ans:
-                    parts = ans.split("'")
-                    whole = int(parts[0])
-                    frac_parts = parts[1].split('/')
-                    return whole + Fraction(int(frac_parts[0]), int(frac_parts[1]))
-                elif '/' in ans:
-                    parts = ans.split('/')
-                    return Fraction(int(parts[0]), int(parts[1]))
-                else:
-                    return Fraction(int(ans))
 
-            val1 = parse_answer(answer1)
-            val2 = parse_answer(answer2)
-            return val1 == val2
-        except:
-            return False
+def create_generator(engine, range_limit, seed=None, limits=None):
+    """limits为 {'max_denominator': ..., 'max_value': ...}，限制中间结果的大小；enumerate引擎不支持"""
+    from generator import ConstructiveExpressionGenerator, EnumerativeExpressionGenerator, ExpressionGenerator
 
+    limits = limits or {}
+    if engine == 'constructive':
+        return ConstructiveExpressionGenerator(range_limit, seed, **limits)
+    if engine == 'enumerate':
+        return EnumerativeExpressionGenerator(range_limit, seed=seed)
+    return ExpressionGenerator(range_limit, seed, **limits)
 
-class FileManager:
-    @staticmethod
-    def save_exercises(exercises, filename='Exercises.txt'):
-        with open(filename, 'w', encoding='utf-8') as f:
-            for i, exercise in enumerate(exercises, 1):
-                f.write(f"{i}. {exercise} =\n")
 
-    @staticmethod
-    def save_answers(answers, filename='Answers.txt'):
-        with open(filename, 'w', encoding='utf-8') as f:
-            for i, answer in enumerate(answers, 1):
-                f.write(f"{i}. {answer}\n")
+def stream_exercises(generator, calculator, stats=None):
+    """无限地逐道产生不重复的合法题目 (题目, 答案)，生成器本身不保存题目列表"""
+    if stats is not None:
+        yield from stream_exercises_profiled(generator, calculator, stats)
+        return
 
-    @staticmethod
-    def load_exercises(filename):
-        exercises = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                if '.' in line:
-                    exercise = line.split('.', 1)[1].strip()
-                    exercise = exercise.rsplit('=', 1)[0].strip()
-                    exercises.append(exercise)
-        return exercises
+    while True:
+        # 生成时已经校验，合法题目的值已放入求值缓存，计算答案时直接命中
+        expression, reason = generator.generate_checked()
 
-    @staticmethod
-    def load_answers(filename):
-        answers = []
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                if '.' in line:
-                    answer = line.split('.', 1)[1].strip()
-                    answers.append(answer)
-        return answers
+        if generator.is_duplicate(expression):
+            continue
 
-    @staticmethod
-    def save_grade(correct, wrong, filename='Grade.txt'):
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(f"Correct: {len(correct)} ({', '.join(map(str, correct))})\n")
-            f.write(f"Wrong: {len(wrong)} ({', '.join(map(str, wrong))})\n")
+        if reason is None:
+            answer = calculator.calculate(expression)
+            generator.duplicates.add(expression)
+            yield expression, answer
+
+
+def stream_exercises_profiled(generator, calculator, stats):
+    """stream_exercises 的统计版本：记录候选数、重复数、各类拒绝原因、重试次数和各步耗时
+
+    生成时已经完成校验，校验耗时计入generate；生成时内部重试掉的候选也按拒绝原因计数。
+    """
+    clock = time.perf_counter
+
+    # 统计 generate_checked 内部的重试；同一个stats可能先后用于多个题目流（如多份题目），只计本次的增量
+    attempts_before = stats.counters['build_attempts']
+    candidates_before = stats.counters['candidates']
+    build_expression = getattr(generator, 'build_expression', None)
+    if build_expression is not None:
+        def counting_build_expression(operands, operators):
+            stats.count('build_attempts')
+            return build_expression(operands, operators)
+        generator.build_expression = counting_build_expression
+    generator.on_reject = lambda reason: stats.count(f'rejected.{reason}')
+
+    try:
+        while True:
+            start = clock()
+            expression, reason = generator.generate_checked()
+            stats.add_time('generate', clock() - start)
+            stats.count('candidates')
+
+            start = clock()
+            duplicate = generator.is_duplicate(expression)
+            stats.add_time('duplicate_check', clock() - start)
+            if duplicate:
+                stats.count('duplicates')
+                continue
+
+            if reason is not None:
+                continue
+
+            start = clock()
+            answer = calculator.calculate(expression)
+            stats.add_time('calculate', clock() - start)
+            generator.duplicates.add(expression)
+            stats.count('accepted')
+            yield expression, answer
+    finally:
+        generator.on_reject = None
+        if build_expression is not None:
+            del generator.build_expression
+            stats.count('build_retries', (stats.counters['build_attempts'] - attempts_before)
+                        - (stats.counters['candidates'] - candidates_before))
+
+
+def collect(stream, n):
+    """从题目流中取n道题目，返回 (题目列表, 答案列表)，并关闭题目流"""
+    exercises = []
+    answers = []
+    with closing(stream):
+        for expression, answer in islice(stream, n):
+            exercises.append(expression)
+            answers.append(answer)
+    return exercises, answers
+
+
+def generate_exercises(generator, calculator, n, stats=None):
+    """生成n道不重复的合法题目，返回 (题目列表, 答案列表)"""
+    return collect(stream_exercises(generator, calculator, stats), n)
+
+
+def write_stream(stream, n, exercise_file='Exercises.txt', answer_file='Answers.txt', echo=False,
+                 checkpoint=None, snapshot=None, resume=None):
+    """把题目流中的n道题目边生成边写入文件，echo为True时同时输出到标准输出，内存占用恒定
+
+    checkpoint不为None时每checkpoint.every道题目及结束时保存检查点，snapshot()返回检查点中除文件位置以外的内容。
+    resume为读取到的检查点时，先把两个文件截断到检查点记录的位置，再从下一个题号继续追加。
+    """
+    written = 0
+    mode = 'w'
+    if resume is not None:
+        written = resume['written']
+        for filename, offset in zip((exercise_file, answer_file), resume['offsets']):
+            if os.path.getsize(filename) < offset:
+                raise ValueError(f"{filename}比检查点记录的短，无法继续")
+            os.truncate(filename, offset)
+        mode = 'a'
+
+    with closing(stream), \
+            open(exercise_file, mode, encoding='utf-8') as exercise_stream, \
+            open(answer_file, mode, encoding='utf-8') as answer_stream:
+        exercises = NumberedWriter(exercise_stream, EXERCISE_SUFFIX, start=written)
+        answers = NumberedWriter(answer_stream, start=written)
+        stdout = NumberedWriter(sys.stdout, start=written) if echo else None
+        for expression, answer in islice(stream, max(0, n - written)):
+            exercises.write(expression)
+            answers.write(answer)
+            if stdout is not None:
+                stdout.write(f"{expression} = {answer}")
+            if checkpoint is not None and exercises.count % checkpoint.every == 0:
+                save_checkpoint(checkpoint, snapshot, exercise_stream, answer_stream, exercises.count)
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, snapshot, exercise_stream, answer_stream, exercises.count)
+    if stdout is not None:
+        sys.stdout.flush()
+
+
+def save_checkpoint(checkpoint, snapshot, exercise_stream, answer_stream, written):
+    """先把已写入的题目落盘，再记录文件位置和题目流状态"""
+    for f in (exercise_stream, answer_stream):
+        f.flush()
+        os.fsync(f.fileno())
+    state = snapshot()
+    state['written'] = written
+    state['offsets'] = (exercise_stream.tell(), answer_stream.tell())
+    checkpoint.save(state)
+
+
+def write_worksheets(generator, calculator, count, size, output_dir='Worksheets', unique_across=False,
+                     archive=False, stats=None):
+    """在同一进程中生成count份、每份size道题目，返回写出的文件名列表
+
+    所有份共用同一个生成器，预计算表和求值缓存一直保持预热。unique_across为False时每份开始前清空查重记录，
+    题目只在每份之内不重复；为True时所有份之间也不重复。
+    archive为False时每份写成一对编号文件 Exercises_01.txt、Answers_01.txt；
+    为True时全部写入二进制归档 Worksheets.bin，头部记录每份题目数和份数，第k份（从1开始）是其中第(k-1)*size到k*size-1题。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    width = len(str(count))
+    files = []
+    archived_exercises = []
+    archived_answers = []
+    for sheet in range(1, count + 1):
+        if sheet == 1 or not unique_across:
+            generator.reset()
+        exercises, answers = generate_exercises(generator, calculator, size, stats)
+        if archive:
+            archived_exercises.extend(exercises)
+            archived_answers.extend(answers)
+            continue
+        exercise_file = os.path.join(output_dir, f"Exercises_{sheet:0{width}d}.txt")
+        answer_file = os.path.join(output_dir, f"Answers_{sheet:0{width}d}.txt")
+        with timer(stats, 'write_files'):
+            save_exercises(exercises, exercise_file)
+            save_answers(answers, answer_file)
+        files += [exercise_file, answer_file]
+
+    if archive:
+        filename = os.path.join(output_dir, 'Worksheets.bin')
+        with timer(stats, 'write_files'):
+            # 答案已经算好，解析回精确值即可，不必重新求值
+            save_binary(filename, archived_exercises, [parse_answer(answer) for answer in archived_answers], size)
+        files.append(filename)
+    if stats is not None:
+        stats.count('worksheets', count)
+    return files
+
+
+def generate_batch(engine, range_limit, seed, size, limits=None):
+    """子进程任务：用独立的随机种子生成一批题目，附带规范形式供全局查重"""
+    generator = create_generator(engine, range_limit, seed, limits)
+    exercises, answers = generate_exercises(generator, ArithmeticCalculator(), size)
+    return [(expression, answer, generator.canonical_key(expression))
+            for expression, answer in zip(exercises, answers)]
+
+
+def stream_parallel(engine, range_limit, workers, batch_size=PARALLEL_BATCH_SIZE, stats=None, seed=None, position=None,
+                    limits=None):
+    """多进程分批生成题目，按提交顺序合并并做全局查重，逐道产生 (题目, 答案)
+
+    第k批使用种子 seed + k，seed固定时结果与进程数无关、可以复现。
+    position为字典时在其中记录合并进度（当前批次、批内已处理的条数和全局查重集合），用于保存检查点；
+    传入检查点中保存的position则从中断处继续。关闭该生成器时取消尚未完成的任务。
+    """
+    import random
+    from concurrent.futures import ProcessPoolExecutor
+
+    if position is None:
+        position = {}
+    if 'seen' not in position:
+        position.update(base_seed=random.randrange(2 ** 32) if seed is None else seed,
+                        batch_size=batch_size, task=0, offset=0, seen=set())
+    base_seed = position['base_seed']
+    batch_size = position['batch_size']
+    seen = position['seen']
+    skip = position['offset']
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        # 保持每个进程有两批任务在排队，主进程合并时子进程不空闲
+        first = position['task']
+        for task in range(first, first + workers * 2):
+            pending.append(executor.submit(generate_batch, engine, range_limit, base_seed + task, batch_size,
+                                           limits))
+        task = first + workers * 2
+
+        while True:
+            with timer(stats, 'wait_workers'):
+                batch = pending.popleft().result()
+            if stats is not None:
+                stats.count('batches')
+                stats.count('candidates', len(batch) - skip)
+            pending.append(executor.submit(generate_batch, engine, range_limit, base_seed + task, batch_size,
+                                           limits))
+            task += 1
+            for offset in range(skip, len(batch)):
+                expression, answer, key = batch[offset]
+                position['offset'] = offset + 1
+                if key in seen:
+                    if stats is not None:
+                        stats.count('duplicates')
+                    continue
+                seen.add(key)
+                yield expression, answer
+            position['task'] += 1
+            position['offset'] = skip = 0
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def generate_parallel(engine, range_limit, n, workers, batch_size=PARALLEL_BATCH_SIZE, stats=None, seed=None,
+                      limits=None):
+    """多进程生成恰好n道不重复的题目，返回 (题目列表, 答案列表)"""
+    return collect(stream_parallel(engine, range_limit, workers, batch_size, stats, seed, limits=limits), n)
+
+
+def grade_chunk(chunk):
+    """批改一组 (题号, 题目, 学生答案)，返回 (题号, 是否正确, 答案是否无法解析) 列表
+
+    学生答案解析为整数对后直接与精确值交叉相乘比较，不格式化标准答案。
+    题目通过求值缓存计算，重复批改同一份题目时直接命中。
+    """
+    values = shared_cache.evaluate_many([exercise for _, exercise, _ in chunk])
+    return [(index, *grade_answer(user_answer, value)) for (index, _, user_answer), value in zip(chunk, values)]
+
+
+def iter_chunks(exercise_file, answer_file, chunk_size):
+    """同步逐行读取题目和答案文件，按题号配对后按chunk_size分组"""
+    chunk = []
+    for item in iter_pairs(exercise_file, answer_file):
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def grade_binary(binary_file, answer_file, grade_file='Grade.txt'):
+    """用二进制题目文件中预先计算好的答案批改，不重新求值，返回 (正确数, 错误数, 无法解析数)"""
+    with BinaryWorksheet(binary_file) as worksheet, GradeWriter(grade_file) as writer:
+        # 二进制文件中第k题（从0开始）的题号为k + 1
+        items = ((k + 1, k) for k in range(len(worksheet)))
+        for number, k, user_answer in pair_by_number(items, iter_numbered_answers(answer_file)):
+            writer.add(number, *grade_answer(user_answer, worksheet.answer(k)))
+    return writer.correct_count, writer.wrong_count, writer.invalid_count
+
+
+def grade_incremental(exercise_file, answer_file, grade_file='Grade.txt', manifest_file=None, chunk_size=1000,
+                      stats=None):
+    """增量批改：内容哈希与清单中记录一致的行沿用上次的结果，只重新批改改动过的行
+
+    返回 (正确数, 错误数, 无法解析数)，并更新清单和 Grade.txt。
+    """
+    from array import array
+
+    from grading_manifest import CORRECT, INVALID, GradingManifest, line_hash, verdict
+
+    if manifest_file is None:
+        manifest_file = grade_file + '.manifest'
+    with timer(stats, 'load_manifest'):
+        previous = GradingManifest.load(manifest_file)
+    manifest = GradingManifest()
+    verdicts = manifest.verdicts
+    numbers = array('Q')
+    changed = []
+    regraded = 0
+
+    def regrade():
+        # 这里传给 grade_chunk 的是行的位置（从1开始），不是题号
+        for position, is_correct, invalid in grade_chunk(changed):
+            verdicts[position - 1] = verdict(is_correct, invalid)
+        changed.clear()
+
+    with timer(stats, 'grading'):
+        for k, (number, exercise, user_answer) in enumerate(iter_pairs(exercise_file, answer_file)):
+            numbers.append(number)
+            digest = line_hash(exercise, user_answer)
+            result = previous.lookup(k, digest)
+            if result is None:
+                changed.append((k + 1, exercise, user_answer))
+                regraded += 1
+                result = 0
+            manifest.append(digest, result)
+            if len(changed) == chunk_size:
+                regrade()
+        regrade()
+
+    with timer(stats, 'write_grade'), GradeWriter(grade_file) as writer:
+        for number, result in zip(numbers, verdicts):
+            writer.add(number, result == CORRECT, result == INVALID)
+    manifest.save(manifest_file)
+    if stats is not None:
+        stats.count('regraded', regraded)
+        stats.count('reused', len(verdicts) - regraded)
+        stats.count('correct', writer.correct_count)
+        stats.count('wrong', writer.wrong_count)
+        stats.count('invalid', writer.invalid_count)
+    return writer.correct_count, writer.wrong_count, writer.invalid_count
+
+
+def grade_files(exercise_file, answer_file, grade_file='Grade.txt', workers=1, chunk_size=1000, stats=None):
+    """流式批改：分块读取、（多进程）批改并增量写入结果，返回 (正确数, 错误数, 无法解析数)"""
+    with timer(stats, 'grading'):
+        if is_binary_worksheet(exercise_file):
+            correct, wrong, invalid = grade_binary(exercise_file, answer_file, grade_file)
+        else:
+            correct, wrong, invalid = grade_text(exercise_file, answer_file, grade_file, workers, chunk_size)
+    if stats is not None:
+        stats.count('correct', correct)
+        stats.count('wrong', wrong)
+        stats.count('invalid', invalid)
+    return correct, wrong, invalid
+
+
+def grade_text(exercise_file, answer_file, grade_file='Grade.txt', workers=1, chunk_size=1000):
+    """批改文本题目文件，workers大于1时多进程批改各分块，返回 (正确数, 错误数, 无法解析数)"""
+    chunks = iter_chunks(exercise_file, answer_file, chunk_size)
+    with GradeWriter(grade_file) as writer:
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers=workers)
+            pending = deque()
+            try:
+                # 最多有 workers * 2 个分块在途，内存占用有上界
+                for chunk in chunks:
+                    pending.append(executor.submit(grade_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        for result in pending.popleft().result():
+                            writer.add(*result)
+                while pending:
+                    for result in pending.popleft().result():
+                        writer.add(*result)
+            finally:
+                executor.shutdown(cancel_futures=True)
+        else:
+            for chunk in chunks:
+                for result in grade_chunk(chunk):
+                    writer.add(*result)
+    return writer.correct_count, writer.wrong_count, writer.invalid_count
 
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description='小学四则运算题目生成器')
     parser.add_argument('-n', type=int, help='生成题目的数量')
     parser.add_argument('-r', type=int, help='数值范围')  # 移除了 required=True
     parser.add_argument('-e', type=str, help='题目文件路径')
     parser.add_argument('-a', type=str, help='答案文件路径')
+    parser.add_argument('--engine', choices=['random', 'constructive', 'enumerate'], default='random',
+                        help='生成引擎：random 随机生成后校验，constructive 自底向上构造（无需重试），'
+                             'enumerate 从枚举出的全部合法题目中抽取（适用于较小的数值范围）')
+    parser.add_argument('--workers', type=int, default=1, help='并行生成或批改的进程数')
+    parser.add_argument('--stats', action='store_true',
+                        help='统计各阶段耗时、候选/拒绝/重复数量等并在结束时打印')
+    parser.add_argument('--stats-output', type=str, help='把统计结果以JSON格式写入该文件（隐含 --stats）')
+    parser.add_argument('--stream', action='store_true',
+                        help='边生成边写入Exercises.txt和Answers.txt，内存占用不随题目数量增长')
+    parser.add_argument('--stdout', action='store_true',
+                        help='流式生成时同时把题目和答案输出到标准输出（隐含 --stream，提示信息改为输出到标准错误）')
+    parser.add_argument('--format', choices=['txt', 'bin'], default='txt',
+                        help='生成题目的文件格式：txt 题目和答案文本文件，bin 含答案的二进制文件Exercises.bin')
+    parser.add_argument('--submissions', type=str,
+                        help='全班批改：答案文件所在目录或通配符（如 "answers/*.txt"），与 -e 一起使用')
+    parser.add_argument('--grade-dir', type=str, default='Grades',
+                        help='全班批改时每名学生的批改文件和汇总文件Summary.txt的输出目录')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量批改：在Grade.txt.manifest中记录每行内容哈希和结果，再次批改时只重新批改改动过的行')
+    parser.add_argument('--max-denominator', type=int,
+                        help='生成时每个中间结果约分后分母的上限，超出时立即放弃该题目（enumerate引擎不支持）')
+    parser.add_argument('--max-value', type=int,
+                        help='生成时每个中间结果绝对值的上限，超出时立即放弃该题目（enumerate引擎不支持）')
+    parser.add_argument('--worksheets', type=int,
+                        help='在一次运行中生成多份题目（每份 -n 道），写入 --output-dir')
+    parser.add_argument('--unique-across', action='store_true',
+                        help='生成多份题目时，所有份之间的题目也互不重复')
+    parser.add_argument('--output-dir', type=str, default='Worksheets',
+                        help='多份题目的输出目录：每份一对 Exercises_k.txt/Answers_k.txt，--format bin 时为一个归档Worksheets.bin')
+    parser.add_argument('--seed', type=int, help='随机种子；指定后相同参数生成的题目完全相同')
+    parser.add_argument('--checkpoint', type=str,
+                        help='定期把生成进度写入该检查点文件（隐含 --stream）')
+    parser.add_argument('--checkpoint-every', type=int,
+                        help='每生成多少道题目保存一次检查点，默认100000')
+    parser.add_argument('--resume', action='store_true',
+                        help='从 --checkpoint 指定的检查点继续生成；检查点不存在时从头开始')
 
     args = parser.parse_args()
+    stats = RunStats() if args.stats or args.stats_output else None
+    stream = args.stream or args.stdout or bool(args.checkpoint)
+    # 题目输出到标准输出时，提示信息改为输出到标准错误，避免混入管道
+    log = sys.stderr if args.stdout else sys.stdout
 
     # 验证参数组合的合法性
     if args.n and args.r:
         # 生成题目模式
-        generator = ExpressionGenerator(args.r)
-        calculator = ArithmeticCalculator()
-        file_manager = FileManager()
-
-        exercises = []
-        answers = []
-        count = 0
-
-        print(f"开始生成{args.n}道题目，数值范围：1-{args.r}")
-
-        while count < args.n:
-            expression = generator.generate_expression()
-
-            if generator.is_duplicate(expression):
-                continue
-
-            answer = calculator.calculate(expression)
-            if answer is not None and generator.validate_expression(expression):
-                exercises.append(expression)
-                answers.append(answer)
-                generator.generated_expressions.add(generator.normalize_expression(expression))
-                count += 1
-
-        file_manager.save_exercises(exercises)
-        file_manager.save_answers(answers)
-        print(f'生成完成！题目保存在Exercises.txt，答案保存在Answers.txt')
+        if stream and args.format == 'bin':
+            print("错误：二进制格式需要先写入索引，不支持流式生成", file=log)
+            return
+
+        limits = {'max_denominator': args.max_denominator, 'max_value': args.max_value}
+        if any(limit is not None and limit < 1 for limit in limits.values()):
+            print("错误：--max-denominator 和 --max-value 必须是正整数", file=log)
+            return
+        if args.engine == 'enumerate' and any(limit is not None for limit in limits.values()):
+            print("错误：enumerate引擎不支持 --max-denominator 和 --max-value", file=log)
+            return
+
+        if args.worksheets and (stream or args.workers > 1):
+            print("错误：生成多份题目时不支持 --stream、--stdout、--checkpoint 和 --workers", file=log)
+            return
+
+        if args.engine == 'enumerate':
+            try:
+                capacity = create_generator(args.engine, args.r).capacity()
+            except ValueError as e:
+                print(f"错误：{e}，请改用 random 或 constructive 引擎", file=log)
+                return
+            print(f"数值范围{args.r}内共有{capacity}道不同的合法题目", file=log)
+            required = args.n * args.worksheets if args.worksheets and args.unique_across else args.n
+            if required > capacity:
+                print(f"错误：无法生成{required}道不重复的题目", file=log)
+                return
+
+        checkpoint = None
+        saved = None
+        options = {'engine': args.engine, 'range': args.r, 'parallel': args.workers > 1, **limits}
+        if args.resume and not args.checkpoint:
+            print("错误：使用 --resume 参数时必须同时提供 --checkpoint 参数", file=log)
+            return
+        if args.checkpoint:
+            from checkpoint import DEFAULT_INTERVAL, Checkpoint
+
+            checkpoint = Checkpoint(args.checkpoint, args.checkpoint_every or DEFAULT_INTERVAL)
+            saved = checkpoint.load() if args.resume else None
+            if saved is not None and saved['options'] != options:
+                print(f"错误：检查点的生成参数 {saved['options']} 与本次不同", file=log)
+                return
+
+        if saved is not None:
+            print(f"从检查点继续：已生成{saved['written']}道题目，共{args.n}道，数值范围：1-{args.r}", file=log)
+        elif args.worksheets:
+            print(f"开始生成{args.worksheets}份题目，每份{args.n}道，数值范围：1-{args.r}", file=log)
+        else:
+            print(f"开始生成{args.n}道题目，数值范围：1-{args.r}", file=log)
+
+        if args.worksheets:
+            generator = create_generator(args.engine, args.r, args.seed, limits)
+            files = write_worksheets(generator, ArithmeticCalculator(), args.worksheets, args.n, args.output_dir,
+                                     args.unique_across, args.format == 'bin', stats)
+            message = f"生成完成！共写出{len(files)}个文件，保存在{args.output_dir}"
+        elif stream:
+            if args.workers > 1:
+                position = saved['source'] if saved is not None else {}
+                exercise_stream = stream_parallel(args.engine, args.r, args.workers, stats=stats,
+                                                  seed=args.seed, position=position, limits=limits)
+                source_state = lambda: position
+            else:
+                generator = create_generator(args.engine, args.r, args.seed, limits)
+                if saved is not None:
+                    generator.set_state(saved['source'])
+                exercise_stream = stream_exercises(generator, ArithmeticCalculator(), stats)
+                source_state = generator.get_state
+            try:
+                write_stream(exercise_stream, args.n, echo=args.stdout, checkpoint=checkpoint,
+                             snapshot=lambda: {'options': options, 'source': source_state()}, resume=saved)
+            except BrokenPipeError:
+                # 下游（如 head）已关闭管道：把标准输出指向devnull，避免退出时刷新缓冲区再次报错
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                sys.exit(1)
+            message = '生成完成！题目保存在Exercises.txt，答案保存在Answers.txt'
+        else:
+            if args.workers > 1:
+                exercises, answers = generate_parallel(args.engine, args.r, args.n, args.workers, stats=stats,
+                                                       seed=args.seed, limits=limits)
+            else:
+                generator = create_generator(args.engine, args.r, args.seed, limits)
+                exercises, answers = generate_exercises(generator, ArithmeticCalculator(), args.n, stats)
+
+            with timer(stats, 'write_files'):
+                if args.format == 'bin':
+                    save_binary('Exercises.bin', exercises,
+                                [shared_cache.evaluate(exercise) for exercise in exercises])
+                    message = '生成完成！题目和答案保存在Exercises.bin'
+                else:
+                    save_exercises(exercises)
+                    save_answers(answers)
+                    message = '生成完成！题目保存在Exercises.txt，答案保存在Answers.txt'
+        print(message, file=log)
+
+    elif args.e and args.submissions:
+        # 全班批改：题目只求值一次
+        from class_grading import find_submissions, grade_class
+
+        answer_files = find_submissions(args.submissions)
+        if not answer_files:
+            print(f"错误：{args.submissions} 中没有找到答案文件")
+            return
+        try:
+            grade_class(args.e, answer_files, args.grade_dir, workers=args.workers, stats=stats)
+        except ValueError as e:
+            print(f"错误：{e}")
+            return
+        print(f"批改完成！{len(answer_files)}份答案的结果保存在{args.grade_dir}，汇总见Summary.txt")
 
     elif args.e and args.a:
         # 批改模式：不需要 -r 参数
-        file_manager = FileManager()
-        calculator = ArithmeticCalculator()
-
-        exercises = file_manager.load_exercises(args.e)
-        user_answers = file_manager.load_answers(args.a)
-
-        correct = []
-        wrong = []
-
-        for i, (exercise, user_answer) in enumerate(zip(exercises, user_answers)):
-            correct_answer = calculator.calculate(exercise)
-            if correct_answer and calculator.compare_answers(user_answer, correct_answer):
-                correct.append(i + 1)
-            else:
-                wrong.append(i + 1)
-
-        file_manager.save_grade(correct, wrong)
+        if args.incremental and not is_binary_worksheet(args.e):
+            _, _, invalid = grade_incremental(args.e, args.a, stats=stats)
+        else:
+            _, _, invalid = grade_files(args.e, args.a, workers=args.workers, stats=stats)
         print("批改完成！结果保存在Grade.txt")
+        if invalid:
+            print(f"其中{invalid}个答案缺失或无法解析，已计为错误并单独列在Invalid行")
 
     else:
         # 参数不完整时的错误提示
         if args.e and not args.a:
-            print("错误：使用 -e 参数时必须同时提供 -a 参数")
+            print("错误：使用 -e 参数时必须同时提供 -a 或 --submissions 参数")
         elif args.a and not args.e:
             print("错误：使用 -a 参数时必须同时提供 -e 参数")
         elif args.n and not args.r:
             print("错误：使用 -n 参数时必须同时提供 -r 参数")
         else:
             parser.print_help()
+        return
+
+    if stats is not None:
+        print(stats.report(), file=log)
+        if args.stats_output:
+            stats.dump(args.stats_output)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd, isqrt
+
+
+# 与生成器的 generate_number 相同，右操作数以这个概率取自然数，否则取真分数
+INTEGER_PROBABILITY = 0.7
+
+
+class OperandTable:
+    """按数值范围建立的右操作数表
+
+    生成器可能产生的数字分为两组，各自按值排序：自然数，以及分母不超过range_limit的真分数
+    （与 generate_number 一样包括 2/4 这样未约分的写法）。在每一组中：
+    - 对减法，左操作数为v时合法的右操作数是所有不大于v的数，即排序后的一段前缀；
+    - 对除法，合法的右操作数是所有大于v的数（商为真分数，排序后的一段后缀）
+      加上能整除v的数（商为整数），后者由v的分子的因数直接构造。
+    每个左操作数只需记录两组的前缀长度和整除它的数，在第一次用到时计算并记住。选取时与 generate_number 一样
+    按70%、30%的比例在自然数和真分数中选一组（某一组没有合法的数时取另一组），再在组内均匀选取，都是O(1)的。
+    """
+
+    def __init__(self, range_limit, include_zero=False, fractions=True):
+        self.range_limit = range_limit
+        integers = range(0 if include_zero else 1, range_limit)
+        proper = sorted(((numerator, denominator) for denominator in range(2, range_limit + 1 if fractions else 2)
+                         for numerator in range(1, denominator)), key=lambda pair: pair[0] / pair[1])
+        # (自然数, 真分数) 两组的文本
+        self.texts = ([str(value) for value in integers], [f"{n}/{d}" for n, d in proper])
+        # 分母不超过range_limit的不同分数转为浮点数后互不相同，按浮点数二分查找比比较Fraction快得多
+        self._keys = ([float(value) for value in integers], [n / d for n, d in proper])
+        # 左操作数 -> (两组的前缀长度, 两组中整除它的数)
+        self._lookups = {}
+
+    def _bisect(self, left):
+        """两组中不大于left的数的个数"""
+        left = float(left)
+        return tuple(bisect_right(keys, left) for keys in self._keys)
+
+    def _divisors(self, left):
+        """两组中不大于left且整除left的数，按值排序，同一个值的不同写法按分母排序
+
+        left = a/b（最简）时，自然数d整除left当且仅当 b = 1 且 d | a；
+        最简真分数p/q整除left当且仅当 p | a 且 b | q，它在表中的写法为 pt/qt（qt ≤ range_limit）。
+        """
+        a, b = left.numerator, left.denominator
+        if a <= 0:
+            return (), ()
+        factors = sorted({d for k in range(1, isqrt(a) + 1) if a % k == 0 for d in (k, a // k)})
+        integers = [str(d) for d in factors if d < self.range_limit] if b == 1 else []
+        if not self.texts[1]:
+            return integers, []
+        # q取b的倍数且 q > p，同时满足 p/q ≤ a/b
+        reduced = sorted(((p, q) for p in factors for q in range(b * (p // b + 1), self.range_limit + 1, b)
+                          if gcd(p, q) == 1 and p * b <= a * q), key=lambda pair: pair[0] / pair[1])
+        return integers, [f"{p * t}/{q * t}" for p, q in reduced for t in range(1, self.range_limit // q + 1)]
+
+    def _lookup(self, left):
+        """返回 (两组的前缀长度, 两组中整除left的数)，第一次用到某个left时计算并记住"""
+        result = self._lookups.get(left)
+        if result is None:
+            result = self._lookups[left] = (self._bisect(left), self._divisors(left))
+        return result
+
+    def _choices(self, operator, left):
+        """两组各自的合法右操作数，每组为 (排序后的文本, 起点, 终点, 另外的数)"""
+        if operator not in ('-', '÷'):
+            return [(texts, 0, len(texts), ()) for texts in self.texts]
+        cutoffs, divisors = self._lookup(Fraction(left))
+        if operator == '-':
+            return [(texts, 0, cutoff, ()) for texts, cutoff in zip(self.texts, cutoffs)]
+        return [(texts, cutoff, len(texts), extra) for texts, cutoff, extra in zip(self.texts, cutoffs, divisors)]
+
+    def right_operand_count(self, operator, left):
+        """左操作数为left时，该运算符下合法右操作数的个数"""
+        return sum(stop - start + len(extra) for _, start, stop, extra in self._choices(operator, left))
+
+    def pick_right(self, operator, left, rng):
+        """随机选取一个使 left operator right 合法的右操作数（字符串），不存在时返回None
+
+        left可以是数字字符串（如 "3/4"）或数值。
+        """
+        choices = self._choices(operator, left)
+        counts = [stop - start + len(extra) for _, start, stop, extra in choices]
+        if counts[0] and counts[1]:
+            group = 0 if rng.random() < INTEGER_PROBABILITY else 1
+        elif counts[0] or counts[1]:
+            group = 0 if counts[0] else 1
+        else:
+            return None
+        texts, start, stop, extra = choices[group]
+        k = rng.randrange(counts[group])
+        if k < stop - start:
+            return texts[start + k]
+        return extra[k - (stop - start)]
+
+
+@lru_cache(maxsize=32)
+def operand_table(range_limit, include_zero=False, fractions=True):
+    """同一数值范围共用一张表"""
+    return OperandTable(range_limit, include_zero, fractions)
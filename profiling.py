@@ -0,0 +1,72 @@
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from evaluation_cache import shared_cache
+
+
+class RunStats:
+    """运行统计：计数器和分阶段计时
+
+    只在 --stats 模式下创建；未开启时调用方传入None，热点路径不做任何额外工作。
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        entry = self.timings.get(name)
+        if entry is None:
+            self.timings[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def to_dict(self):
+        return {
+            'total_seconds': time.perf_counter() - self.started,
+            'counters': dict(sorted(self.counters.items())),
+            'timings': {name: {'calls': calls, 'seconds': seconds}
+                        for name, (calls, seconds) in sorted(self.timings.items())},
+            'evaluation_cache': shared_cache.stats(),
+        }
+
+    def report(self):
+        """生成便于阅读的文本摘要"""
+        summary = self.to_dict()
+        lines = [f"总耗时: {summary['total_seconds']:.3f}s", "计数:"]
+        for name, value in summary['counters'].items():
+            lines.append(f"  {name:<32} {value:>12}")
+        lines.append("计时:")
+        for name, timing in summary['timings'].items():
+            lines.append(f"  {name:<32} {timing['seconds']:>10.3f}s {timing['calls']:>10} 次")
+        lines.append("求值缓存:")
+        for name, value in summary['evaluation_cache'].items():
+            lines.append(f"  {name:<32} {value:>12}")
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        import json
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def timer(stats, name):
+    """stats为None时返回空上下文"""
+    if stats is None:
+        return nullcontext()
+    return stats.timer(name)
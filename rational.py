@@ -0,0 +1,140 @@
+from math import gcd
+
+
+class Rational:
+    """轻量级有理数：分子分母两个整数，分母恒为正
+
+    运算过程中不做约分，只在格式化、判断整数等需要时才计算gcd。
+    运算对象可以是Rational、int或Fraction（三者都有numerator和denominator属性）。
+    """
+
+    __slots__ = ('numerator', 'denominator')
+
+    def __init__(self, numerator, denominator=1):
+        if denominator == 0:
+            raise ZeroDivisionError(f"Rational({numerator}, 0)")
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        self.numerator = numerator
+        self.denominator = denominator
+
+    def reduced(self):
+        """返回约分后的Rational"""
+        divisor = gcd(self.numerator, self.denominator)
+        if divisor == 1:
+            return self
+        return Rational(self.numerator // divisor, self.denominator // divisor)
+
+    def is_integer(self):
+        return self.numerator % self.denominator == 0
+
+    def to_fraction(self):
+        from fractions import Fraction
+
+        return Fraction(self.numerator, self.denominator)
+
+    def __add__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        if od == self.denominator:
+            return Rational(self.numerator + on, od)
+        return Rational(self.numerator * od + on * self.denominator, self.denominator * od)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        if od == self.denominator:
+            return Rational(self.numerator - on, od)
+        return Rational(self.numerator * od - on * self.denominator, self.denominator * od)
+
+    def __rsub__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        return Rational(on * self.denominator - self.numerator * od, self.denominator * od)
+
+    def __mul__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        return Rational(self.numerator * on, self.denominator * od)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        return Rational(self.numerator * od, self.denominator * on)
+
+    def __rtruediv__(self, other):
+        try:
+            on, od = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        return Rational(on * self.denominator, od * self.numerator)
+
+    def __neg__(self):
+        return Rational(-self.numerator, self.denominator)
+
+    def __bool__(self):
+        return self.numerator != 0
+
+    def _compare(self, other):
+        """交叉相乘比较，返回 (左边, 右边) 两个整数；分母均为正"""
+        return self.numerator * other.denominator, other.numerator * self.denominator
+
+    def __eq__(self, other):
+        if not hasattr(other, 'denominator'):
+            return NotImplemented
+        left, right = self._compare(other)
+        return left == right
+
+    def __lt__(self, other):
+        if not hasattr(other, 'denominator'):
+            return NotImplemented
+        left, right = self._compare(other)
+        return left < right
+
+    def __le__(self, other):
+        if not hasattr(other, 'denominator'):
+            return NotImplemented
+        left, right = self._compare(other)
+        return left <= right
+
+    def __gt__(self, other):
+        if not hasattr(other, 'denominator'):
+            return NotImplemented
+        left, right = self._compare(other)
+        return left > right
+
+    def __ge__(self, other):
+        if not hasattr(other, 'denominator'):
+            return NotImplemented
+        left, right = self._compare(other)
+        return left >= right
+
+    def __hash__(self):
+        # 与相等的int/Fraction保持一致
+        return hash(self.to_fraction())
+
+    def __float__(self):
+        return self.numerator / self.denominator
+
+    def __str__(self):
+        value = self.reduced()
+        if value.denominator == 1:
+            return str(value.numerator)
+        return f"{value.numerator}/{value.denominator}"
+
+    def __repr__(self):
+        return f"Rational({self.numerator}, {self.denominator})"